@@ -0,0 +1,518 @@
+##############################################################
+#
+# Benchmark suite for all the algorithms and graph backends.
+# The graphs are built by deterministic generators (same seed =>
+# same graph), every algorithm is timed on every backend for
+# several sizes and we record the wall time, the peak memory and
+# the number of vertices settled by the algorithm.
+# The results are emitted as JSON so two runs (i.e two commits) can
+# be compared with --compare
+#
+# usage:
+#   python benchmark.py --output before.json
+#   python benchmark.py --output after.json --compare before.json
+#   python benchmark.py --profile   (adds the instrumentation counters)
+#   python benchmark.py --parity    (python vs jit backend of the algorithms)
+#
+##############################################################
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from functools import partial
+from math import isqrt
+
+import components
+import djikstra
+import instrumentation
+import kernels
+import kruskal
+import prim
+import shortest_path
+import topological_sort
+import traversal
+from graph import *
+
+SIZES = {
+    "small": 100,
+    "medium": 300,
+    "large": 1000,
+}
+
+# Maps a backend name to (graph class, can it store edge weights).
+# The generators' weights are < 100 so they fit in a uint8 matrix
+BACKENDS = {
+    "matrix": (AdjacencyMatrixGraph, True),
+    "matrix_float32": (partial(AdjacencyMatrixGraph, dtype=np.float32), True),
+    "matrix_uint8": (partial(AdjacencyMatrixGraph, dtype=np.uint8), True),
+    "matrix_bits": (partial(AdjacencyMatrixGraph, dtype="bits"), False),
+    "set": (AdjacencySetGraph, False),
+    "csr": (CSRGraph, True),
+}
+
+######################################################################
+#
+# Graph generators. Each one returns a tuple of
+# (num_vertices, sources, destinations, weights) where the 3 last
+# are numpy arrays describing the edges
+#
+######################################################################
+
+
+def erdos_renyi(num_vertices, seed, average_degree=4):
+    rng = np.random.default_rng(seed)
+    num_edges = num_vertices * average_degree
+
+    sources = rng.integers(0, num_vertices, num_edges)
+    destinations = rng.integers(0, num_vertices, num_edges)
+    weights = rng.integers(1, 100, num_edges)
+
+    # no vertex can be adjacent to itself
+    keep = sources != destinations
+    return num_vertices, sources[keep], destinations[keep], weights[keep]
+
+
+def grid(num_vertices, seed):
+    # Road-like graph: every vertex is linked to its right and bottom
+    # neighbors, with small weights
+    rng = np.random.default_rng(seed)
+    side = max(2, isqrt(num_vertices))
+    vertices = np.arange(side * side).reshape(side, side)
+
+    sources = np.concatenate((vertices[:, :-1].ravel(), vertices[:-1, :].ravel()))
+    destinations = np.concatenate((vertices[:, 1:].ravel(), vertices[1:, :].ravel()))
+    weights = rng.integers(1, 10, len(sources))
+
+    return side * side, sources, destinations, weights
+
+
+def power_law(num_vertices, seed, edges_per_vertex=2):
+    # Preferential attachment (Barabasi-Albert): each new vertex is
+    # linked to vertices picked with a probability proportional to
+    # their degree, which gives a few hubs and a lot of leaves.
+    # The edges go from the old vertex to the new one, so in the
+    # directed graph all the vertices are reachable from vertex 0
+    rng = np.random.default_rng(seed)
+    sources = [0]
+    destinations = [1]
+    # every vertex appears in this list once per incident edge
+    endpoints = [0, 1]
+
+    for v in range(2, num_vertices):
+        targets = set()
+        while len(targets) < min(edges_per_vertex, v):
+            targets.add(endpoints[rng.integers(0, len(endpoints))])
+
+        for target in targets:
+            sources.append(target)
+            destinations.append(v)
+            endpoints.extend((v, target))
+
+    weights = rng.integers(1, 100, len(sources))
+    return num_vertices, np.array(sources), np.array(destinations), weights
+
+
+def dag_layers(num_vertices, seed, edges_per_vertex=3):
+    # Directed acyclic graph: vertices are split in layers and the
+    # edges only go from a layer to the next one
+    rng = np.random.default_rng(seed)
+    num_layers = max(2, isqrt(num_vertices))
+    layers = np.array_split(np.arange(num_vertices), num_layers)
+
+    sources = []
+    destinations = []
+    for layer, next_layer in zip(layers, layers[1:]):
+        for v in layer:
+            for target in rng.choice(next_layer, min(edges_per_vertex, len(next_layer)),
+                                     replace=False):
+                sources.append(v)
+                destinations.append(target)
+
+    weights = rng.integers(1, 100, len(sources))
+    return num_vertices, np.array(sources), np.array(destinations), weights
+
+
+GENERATORS = {
+    "erdos_renyi": erdos_renyi,
+    "grid": grid,
+    "power_law": power_law,
+    "dag_layers": dag_layers,
+}
+
+######################################################################
+#
+# Algorithms. Each runner calls the algorithm on the graph and
+# returns the number of vertices it has settled
+#
+######################################################################
+
+
+def settled_in_table(distance_table):
+    return sum(1 for distance, _ in distance_table.values() if distance is not None)
+
+
+def run_djikstra(graph, backend="python"):
+    return settled_in_table(djikstra.build_distance_table(graph, 0, backend))
+
+
+def run_shortest_path(graph, backend="python"):
+    return settled_in_table(shortest_path.build_distance_table(graph, 0, backend))
+
+
+def run_prim(graph, backend="python"):
+    return len(prim.spanning_tree(graph, 0, backend)) + 1
+
+
+def run_kruskal(graph):
+    tree = kruskal.spanning_tree(graph)
+    # the vertices settled are the ones touched by an edge of the tree
+    return len({v for u in tree for v in tree[u]} | {u for u in tree if tree[u]})
+
+
+def run_topological_sort(graph, backend="python"):
+    return len(topological_sort.topological_sort(graph, backend))
+
+
+def run_breadth_first(graph):
+    return int(traversal.breadth_first(graph, 0).sum())
+
+
+def run_depth_first(graph):
+    visited = np.zeros(graph.numVertices)
+    # depth_first is recursive, it can go as deep as the number of vertices
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, graph.numVertices + 1000))
+    try:
+        traversal.depth_first(graph, visited, 0)
+    finally:
+        sys.setrecursionlimit(limit)
+    return int(visited.sum())
+
+
+def run_connected_components(graph, method="label_propagation"):
+    # every vertex gets a label, so the number of components is what
+    # tells two runs apart
+    return components.num_components(components.connected_components(graph, method))
+
+
+def run_strongly_connected_components(graph):
+    return components.num_components(components.strongly_connected_components(graph))
+
+
+# Maps an algorithm name to (runner, directed, generators it runs on,
+# biggest number of vertices it is benchmarked with)
+ALGORITHMS = {
+    "djikstra": (run_djikstra, True, ("erdos_renyi", "grid", "power_law"), None),
+    "shortest_path": (run_shortest_path, True, ("erdos_renyi", "grid", "power_law"), None),
+    "prim": (run_prim, False, ("erdos_renyi", "grid", "power_law"), None),
+    # the cycle detection of kruskal is run after every edge added
+    # to the tree, it does not scale further than the small graphs
+    "kruskal": (run_kruskal, False, ("erdos_renyi", "grid", "power_law"), 100),
+    "topological_sort": (run_topological_sort, True, ("dag_layers",), None),
+    "breadth_first": (run_breadth_first, True, ("erdos_renyi", "grid", "power_law"), None),
+    "depth_first": (run_depth_first, True, ("erdos_renyi", "grid", "power_law"), None),
+    "connected_components": (run_connected_components, False,
+                             ("erdos_renyi", "grid", "power_law"), None),
+    "connected_components_union_find": (partial(run_connected_components, method="union_find"),
+                                        False, ("erdos_renyi", "grid", "power_law"), None),
+    "strongly_connected_components": (run_strongly_connected_components, True,
+                                      ("erdos_renyi", "grid", "power_law"), None),
+}
+
+# The algorithms which have a compiled kernel are also run with
+# backend="jit", under the name "<algorithm>_jit"
+JIT_ALGORITHMS = ("djikstra", "shortest_path", "prim", "topological_sort")
+
+for name in JIT_ALGORITHMS:
+    runner, directed, generators, max_vertices = ALGORITHMS[name]
+    ALGORITHMS[name + "_jit"] = (partial(runner, backend="jit"), directed, generators,
+                                 max_vertices)
+
+
+def build_graph(backend, generator, num_vertices, directed, seed):
+    graph_class, weighted = BACKENDS[backend]
+    num_vertices, sources, destinations, weights = GENERATORS[generator](
+        num_vertices, seed)
+
+    graph = graph_class(num_vertices, directed=directed)
+    graph.add_edges(sources, destinations, weights if weighted else None)
+    return graph, len(sources)
+
+
+def graph_memory(graph):
+    # bytes taken by the arrays of the graph, None for the adjacency
+    # sets which are made of python objects
+    if isinstance(graph, AdjacencyMatrixGraph):
+        return graph.matrix.nbytes
+    if isinstance(graph, CSRGraph):
+        indptr, indices, weights = graph.to_csr()
+        return indptr.nbytes + indices.nbytes + weights.nbytes
+    return None
+
+
+def measure(runner, graph, repeats, profiled=False):
+    # The algorithms print their results, that output is thrown away
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        seconds = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            settled = runner(graph)
+            elapsed = time.perf_counter() - start
+            if seconds is None or elapsed < seconds:
+                seconds = elapsed
+
+        # tracemalloc slows down the algorithm, so the peak memory is
+        # measured on a separate run which is not timed
+        tracemalloc.start()
+        try:
+            runner(graph)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        # Same thing for the instrumentation counters
+        profile = None
+        if profiled:
+            with instrumentation.profile() as p:
+                runner(graph)
+            profile = p.total().as_dict()
+
+    return seconds, peak, settled, profile
+
+
+def run(algorithms=None, backends=None, sizes=None, repeats=3, seed=0,
+        profiled=False):
+    results = []
+    for name in algorithms or ALGORITHMS:
+        runner, directed, generators, max_vertices = ALGORITHMS[name]
+
+        for backend in backends or BACKENDS:
+            for generator in generators:
+                for size in sizes or SIZES:
+                    num_vertices = SIZES[size]
+                    if max_vertices is not None and num_vertices > max_vertices:
+                        continue
+
+                    graph, num_edges = build_graph(backend, generator, num_vertices,
+                                                   directed, seed)
+                    seconds, peak, settled, profile = measure(runner, graph, repeats,
+                                                              profiled)
+
+                    results.append({
+                        "algorithm": name,
+                        "backend": backend,
+                        "generator": generator,
+                        "size": size,
+                        "num_vertices": graph.numVertices,
+                        "num_edges": num_edges,
+                        "seconds": seconds,
+                        "peak_memory": peak,
+                        "graph_memory": graph_memory(graph),
+                        "vertices_settled": settled,
+                    })
+                    if profile is not None:
+                        results[-1]["profile"] = profile
+                    print("%-16s %-7s %-12s %-7s %10.6f s %12d B %7d settled"
+                          % (name, backend, generator, size, seconds, peak, settled),
+                          file=sys.stderr)
+
+    return results
+
+
+def parity(backends=None, sizes=None, repeats=3, seed=0):
+    # Run the algorithms which have a compiled kernel with both
+    # backends, check they give the same result and time them. The
+    # first jit call, which compiles the kernel, is not timed
+    calls = {
+        "djikstra": lambda graph, backend: djikstra.build_distance_table(graph, 0, backend),
+        "shortest_path": lambda graph, backend: shortest_path.build_distance_table(
+            graph, 0, backend),
+        "prim": lambda graph, backend: prim.spanning_tree(graph, 0, backend),
+        "topological_sort": lambda graph, backend: topological_sort.topological_sort(
+            graph, backend),
+    }
+
+    results = []
+    for name in JIT_ALGORITHMS:
+        _, directed, generators, max_vertices = ALGORITHMS[name]
+        call = calls[name]
+
+        for backend in backends or BACKENDS:
+            for generator in generators:
+                for size in sizes or SIZES:
+                    graph, num_edges = build_graph(backend, generator, SIZES[size],
+                                                   directed, seed)
+
+                    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                        same = call(graph, "python") == call(graph, "jit")
+                        seconds = {}
+                        for execution in kernels.BACKENDS:
+                            seconds[execution] = min(
+                                timed(call, graph, execution) for _ in range(repeats))
+
+                    results.append({
+                        "algorithm": name,
+                        "backend": backend,
+                        "generator": generator,
+                        "size": size,
+                        "num_vertices": graph.numVertices,
+                        "num_edges": num_edges,
+                        "same_result": same,
+                        "python_seconds": seconds["python"],
+                        "jit_seconds": seconds["jit"],
+                        "speedup": seconds["python"] / seconds["jit"],
+                    })
+                    print("%-16s %-7s %-12s %-7s %-9s x%8.1f"
+                          % (name, backend, generator, size,
+                             "same" if same else "DIFFERENT", results[-1]["speedup"]),
+                          file=sys.stderr)
+
+    results.extend(path_parity(backends, repeats))
+    return results
+
+
+def path_parity(backends=None, repeats=3, source=300):
+    # The paths are rebuilt by following the predecessors of the
+    # distance table back to the source. The generated graphs are only
+    # searched from vertex 0, so this checks a chain starting at a
+    # source > 256: python only shares the int objects up to 256, the
+    # source must be found by value and not by identity
+    calls = {
+        "djikstra_path": lambda graph, backend: djikstra.shortest_path(
+            graph, source, source + 2, backend),
+        "shortest_path_path": lambda graph, backend: shortest_path.shortest_path(
+            graph, source, source + 2, backend),
+    }
+    expected = [source, source + 1, source + 2]
+
+    results = []
+    for name, call in calls.items():
+        for backend in backends or BACKENDS:
+            graph = BACKENDS[backend][0](source + 100, directed=True)
+            graph.add_edges([source, source + 1], [source + 1, source + 2])
+
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                same = call(graph, "python") == call(graph, "jit") == expected
+                seconds = {}
+                for execution in kernels.BACKENDS:
+                    seconds[execution] = min(
+                        timed(call, graph, execution) for _ in range(repeats))
+
+            results.append({
+                "algorithm": name,
+                "backend": backend,
+                "generator": "chain",
+                "size": "source_%d" % source,
+                "num_vertices": graph.numVertices,
+                "num_edges": 2,
+                "same_result": same,
+                "python_seconds": seconds["python"],
+                "jit_seconds": seconds["jit"],
+                "speedup": seconds["python"] / seconds["jit"],
+            })
+            print("%-16s %-7s %-12s %-7s %-9s x%8.1f"
+                  % (name, backend, "chain", "source_%d" % source,
+                     "same" if same else "DIFFERENT", results[-1]["speedup"]),
+                  file=sys.stderr)
+
+    return results
+
+
+def timed(call, graph, backend):
+    start = time.perf_counter()
+    call(graph, backend)
+    return time.perf_counter() - start
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return (result["algorithm"], result["backend"], result["generator"], result["size"])
+
+
+def compare(baseline, current, threshold=0.1):
+    # Print the speed ratio of every benchmark found in both reports.
+    # Returns the number of benchmarks slower than the baseline by more
+    # than threshold (10% by default)
+    previous = {result_key(result): result for result in baseline["results"]}
+    regressions = 0
+
+    for result in current["results"]:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+
+        ratio = result["seconds"] / old["seconds"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "REGRESSION"
+            regressions = regressions + 1
+        elif old["vertices_settled"] != result["vertices_settled"]:
+            flag = "DIFFERENT RESULT"
+
+        print("%-16s %-7s %-12s %-7s x%6.2f %s" % (result_key(result) + (ratio, flag)))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the graph algorithms")
+    parser.add_argument("--algorithms", nargs="+", choices=list(ALGORITHMS))
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS))
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["small", "medium"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", action="store_true",
+                        help="record the instrumentation counters of each benchmark")
+    parser.add_argument("--parity", action="store_true",
+                        help="only compare the python and jit backends of the algorithms")
+    parser.add_argument("--output", help="write the JSON report in this file")
+    parser.add_argument("--compare", help="JSON report of a previous run to compare with")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "jit_enabled": kernels.JIT_ENABLED,
+        "seed": args.seed,
+    }
+
+    if args.parity:
+        report["parity"] = parity(args.backends, args.sizes, args.repeats, args.seed)
+    else:
+        report["results"] = run(args.algorithms, args.backends, args.sizes, args.repeats,
+                                args.seed, args.profile)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.parity:
+        return 0 if all(result["same_result"] for result in report["parity"]) else 1
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 1 if compare(baseline, report) else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+##############################################################
+#
+# Benchmark of the streaming loaders: a random graph is written
+# in each supported format in a temporary directory, then loaded
+# back and the throughput is reported in edges per second
+#
+##############################################################
+import os
+import sys
+import tempfile
+import time
+
+import loader
+from graph import *
+
+
+def write_edge_list(path, sources, destinations, weights, delimiter=" ",
+                    header=None):
+    with open(path, "w") as f:
+        if header is not None:
+            f.write(header + "\n")
+        np.savetxt(f, np.column_stack((sources, destinations, weights)),
+                   fmt="%d", delimiter=delimiter)
+
+
+def write_matrix_market(path, num_vertices, sources, destinations, weights):
+    with open(path, "w") as f:
+        f.write("%%MatrixMarket matrix coordinate integer general\n")
+        f.write("%d %d %d\n" % (num_vertices, num_vertices, len(sources)))
+        np.savetxt(f, np.column_stack((sources + 1, destinations + 1, weights)),
+                   fmt="%d")
+
+
+def report(name, num_edges, seconds):
+    print("%-14s %9d edges %8.3f s %12.0f edges/s"
+          % (name, num_edges, seconds, num_edges / seconds))
+
+
+def run(num_vertices=2000, num_edges=200000, chunk_size=loader.DEFAULT_CHUNK_SIZE,
+        seed=0):
+    rng = np.random.default_rng(seed)
+    sources = rng.integers(0, num_vertices, num_edges)
+    destinations = rng.integers(0, num_vertices, num_edges)
+    weights = rng.integers(1, 100, num_edges)
+
+    with tempfile.TemporaryDirectory() as directory:
+        edge_list = os.path.join(directory, "graph.txt")
+        csv = os.path.join(directory, "graph.csv")
+        mtx = os.path.join(directory, "graph.mtx")
+
+        write_edge_list(edge_list, sources, destinations, weights)
+        write_edge_list(csv, sources, destinations, weights, delimiter=",",
+                        header="source,target,weight")
+        write_matrix_market(mtx, num_vertices, sources, destinations, weights)
+
+        start = time.perf_counter()
+        loader.load_edge_list(edge_list, directed=True, weighted=True,
+                              chunk_size=chunk_size)
+        report("edge list", num_edges, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        loader.load_csv(csv, directed=True, source="source",
+                        destination="target", weight="weight",
+                        chunk_size=chunk_size)
+        report("csv", num_edges, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        loader.load_matrix_market(mtx, chunk_size=chunk_size)
+        report("matrix market", num_edges, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    # usage: python benchmark_loader.py [num_vertices] [num_edges]
+    run(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,126 @@
+##############################################################
+#
+# Connected components (undirected graph) and strongly connected
+# components (directed graph).
+# Both return a compact int32 array of labels: labels[v] is the
+# number of the component of v, the components are numbered from
+# 0 in the order of their smallest vertex.
+# Nothing is recursive here, so unlike running
+# traversal.depth_first from every vertex there is no recursion
+# limit to hit on big graphs
+#
+##############################################################
+import instrumentation
+import kernels
+from graph import *
+
+METHODS = ("label_propagation", "union_find")
+
+
+def _compact(roots):
+    # roots[v] is any vertex of the component of v; renumber the
+    # components 0..k-1 in the order of their smallest vertex
+    _, first, inverse = np.unique(roots, return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int32)
+    rank[np.argsort(first, kind="stable")] = np.arange(len(first), dtype=np.int32)
+    return rank[inverse.reshape(-1)]
+
+
+def _label_propagation(indptr, indices):
+    # Every vertex starts as the root of its own tree, labels[v] is its
+    # parent and labels[v] <= v. Each round is a few numpy operations
+    # over all the edges at once:
+    #   - hooking: for every edge joining two trees, the root of the
+    #     tree with the larger root is pointed to the smaller root
+    #   - pointer jumping: labels[v] is replaced by labels[labels[v]]
+    #     until every vertex points directly to its root
+    # Hooking the roots (not the vertices) merges at least half of the
+    # trees of a component every round, so the number of rounds is
+    # O(log V) whatever the diameter of the graph (a road network or a
+    # long path converges as fast as a random graph)
+    num_vertices = len(indptr) - 1
+    sources = np.repeat(np.arange(num_vertices), np.diff(indptr))
+    destinations = indices.astype(np.int64)
+
+    labels = np.arange(num_vertices)
+    while True:
+        previous = labels.copy()
+        # the edges are followed in both directions
+        np.minimum.at(labels, labels[sources], labels[destinations])
+        np.minimum.at(labels, labels[destinations], labels[sources])
+
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def connected_components(graph, method="label_propagation"):
+    # For a directed graph the direction of the edges is ignored,
+    # which gives the weakly connected components
+    if method not in METHODS:
+        raise ValueError("Unknown method %s, expected one of %s"
+                         % (method, ", ".join(METHODS)))
+
+    # stats is None unless an instrumentation profile is active
+    graph, stats = instrumentation.start("connected_components", graph)
+
+    indptr, indices, _ = graph.to_csr()
+
+    if stats is not None:
+        stats.mark("to_csr")
+
+    if method == "union_find":
+        roots = kernels.union_find_kernel(indptr, indices)
+    else:
+        roots = _label_propagation(indptr, indices)
+
+    labels = _compact(roots)
+
+    if stats is not None:
+        stats.visited_vertices = graph.numVertices
+        stats.mark("search")
+
+    return labels
+
+
+def strongly_connected_components(graph):
+    # stats is None unless an instrumentation profile is active
+    graph, stats = instrumentation.start("strongly_connected_components", graph)
+
+    indptr, indices, _ = graph.to_csr()
+
+    if stats is not None:
+        stats.mark("to_csr")
+
+    labels = _compact(kernels.tarjan_kernel(indptr, indices))
+
+    if stats is not None:
+        stats.visited_vertices = graph.numVertices
+        stats.mark("search")
+
+    return labels
+
+
+def num_components(labels):
+    return int(labels.max()) + 1 if len(labels) else 0
+
+
+# Test the implementation
+if __name__ == "__main__":
+    g = AdjacencyMatrixGraph(8, directed=True)
+    g.add_edge(0, 1)
+    g.add_edge(1, 2)
+    g.add_edge(2, 0)
+    g.add_edge(2, 3)
+    g.add_edge(3, 4)
+    g.add_edge(4, 3)
+    g.add_edge(5, 6)
+
+    print("Strongly connected components: ", strongly_connected_components(g))
+    print("Weakly connected components: ", connected_components(g))
+    print("With union find: ", connected_components(g, method="union_find"))
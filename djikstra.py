@@ -7,12 +7,20 @@
 #
 ##############################################################
 from typing import ItemsView
+import instrumentation
+import kernels
 import priority_dict
 
 from graph import *
 
 
-def build_distance_table(graph, source):
+def build_distance_table(graph, source, backend="python"):
+    # stats is None unless an instrumentation profile is active
+    graph, stats = instrumentation.start("djikstra", graph)
+
+    # backend="jit" runs the compiled kernel on the CSR arrays
+    if kernels.use_jit(backend):
+        return _build_distance_table_jit(graph, source, stats)
 
     # A dictionnary mapping from the vertex number to a tuple of
     # (distance_from_source, last vertex seen on path from source)
@@ -29,21 +37,32 @@ def build_distance_table(graph, source):
     # Access to the highest priority  (lowest distance) Item first.
     # priorityQueue[vertex] = distance; where the distance value forms that priority.
     priority_queue = priority_dict.priority_dict()
+    priority_queue.stats = stats
 
     # The distance from the source of the source is =0
     priority_queue[source] = 0
 
+    if stats is not None:
+        stats.mark("initialize")
+
     while len(priority_queue.keys()) > 0:
         # Process the vertex with the smallest priority (=weight)
         current_vertex = priority_queue.pop_smallest()
 
+        if stats is not None:
+            stats.visited_vertices += 1
+
         # The distance of the current node from the source
         current_distance = distance_table[current_vertex][0]
 
         for neighbor in graph.get_adjacent_vertices(current_vertex):
-            # Calculate the new distance
+            if stats is not None:
+                stats.edge_relaxations += 1
+
+            # Calculate the new distance. get_edge_weight gives python
+            # numbers, so the sum can't overflow the dtype of a matrix
             distance = current_distance + \
-                g.get_edge_weight(current_vertex, neighbor)
+                graph.get_edge_weight(current_vertex, neighbor)
 
             # Recorded the last distance of his neighbor from the source
             neighbor_distance = distance_table[neighbor][0]
@@ -56,14 +75,38 @@ def build_distance_table(graph, source):
                 # We also need to update the priority queue with the distance
                 priority_queue[neighbor] = distance
 
+    if stats is not None:
+        stats.mark("search")
+
+    return distance_table
+
+
+def _build_distance_table_jit(graph, source, stats):
+    indptr, indices, weights = graph.to_csr()
+
+    if stats is not None:
+        stats.mark("to_csr")
+
+    distance, previous = kernels.djikstra_kernel(indptr, indices, weights, source)
+
+    if stats is not None:
+        stats.visited_vertices = int(np.count_nonzero(previous >= 0))
+        stats.mark("search")
+
+    # Same distance table than the python version
+    distance_table = {}
+    for i, (d, p) in enumerate(zip(distance.tolist(), previous.tolist())):
+        distance_table[i] = (None, None) if p < 0 else (d, p)
+    distance_table[source] = (0, source)
+
     return distance_table
 
 
-def shortest_path(graph, source, destination):
+def shortest_path(graph, source, destination, backend="python"):
     # The shortest_path function is exactly the same as the shortest_path algorithm
 
     # Build the table_distance
-    distance_table = build_distance_table(graph, source)
+    distance_table = build_distance_table(graph, source, backend)
 
     # Initialy, in the short path there is only the destination
     # at the end we will backtrack the list to get the shortest_path
@@ -72,7 +115,7 @@ def shortest_path(graph, source, destination):
     # Find the last preceeding node in order to get our distance from the source
     previous_vertex = distance_table[destination][1]
 
-    while previous_vertex is not None and previous_vertex is not source:
+    while previous_vertex is not None and previous_vertex != source:
         path = [previous_vertex] + path
         previous_vertex = distance_table[previous_vertex][1]
 
@@ -81,22 +124,23 @@ def shortest_path(graph, source, destination):
     else:
         path = [source] + path
         print("Shortest path is ", path)
+        return path
 
 
 # Test implementation
-g = AdjacencyMatrixGraph(8, directed=True)
-g.add_edge(0, 1, 1)
-g.add_edge(1, 2, 2)
-g.add_edge(1, 3, 6)
-g.add_edge(2, 3, 2)
-g.add_edge(1, 4, 3)
-g.add_edge(3, 5, 1)
-g.add_edge(5, 4, 5)
-g.add_edge(3, 6, 1)
-g.add_edge(6, 7, 1)
-g.add_edge(0, 7, 8)
-
-
-shortest_path(g, 0, 6)
-shortest_path(g, 4, 7)
-shortest_path(g, 7, 0)
+if __name__ == "__main__":
+    g = AdjacencyMatrixGraph(8, directed=True)
+    g.add_edge(0, 1, 1)
+    g.add_edge(1, 2, 2)
+    g.add_edge(1, 3, 6)
+    g.add_edge(2, 3, 2)
+    g.add_edge(1, 4, 3)
+    g.add_edge(3, 5, 1)
+    g.add_edge(5, 4, 5)
+    g.add_edge(3, 6, 1)
+    g.add_edge(6, 7, 1)
+    g.add_edge(0, 7, 8)
+
+    shortest_path(g, 0, 6)
+    shortest_path(g, 4, 7)
+    shortest_path(g, 7, 0)
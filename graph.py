@@ -1,8 +1,62 @@
 import abc
+import threading
+from collections import deque, namedtuple
 from typing import no_type_check_decorator
 
 import numpy as np
 
+###################################################################
+#
+# The log of the changes made to a graph. Every mutation gets a new
+# version number and is handed to the subscribers, so the caches and
+# indexes built on a graph can update themselves instead of being
+# rebuilt. The last changes are also kept, a subscriber which
+# missed some can get them back with since(version)
+#
+###################################################################
+
+# kind is one of "add_edge", "add_edges", "remove_edge",
+# "remove_vertex", "update_weight". For "add_edges" v1, v2 and weight
+# are the arrays given to add_edges, for "remove_vertex" only v1 is set
+Change = namedtuple("Change", ["version", "kind", "v1", "v2", "weight"])
+
+
+class ChangeLog:
+    def __init__(self, maxlen=10000):
+        self.version = 0
+        self._changes = deque(maxlen=maxlen)
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        # callback(change) is called after every change of the graph
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def record(self, kind, v1, v2=None, weight=None):
+        self.version = self.version + 1
+        change = Change(self.version, kind, v1, v2, weight)
+        self._changes.append(change)
+
+        for callback in list(self._subscribers):
+            callback(change)
+
+        return change
+
+    def since(self, version):
+        # The changes made after the given version. When some of them
+        # are no longer in the log a ValueError is raised, the caller
+        # then has to rebuild from the graph itself
+        if version > self.version:
+            raise ValueError("Version %d is in the future" % version)
+
+        missing = self.version - version
+        if missing > len(self._changes):
+            raise ValueError("The changes since version %d are no longer logged" % version)
+
+        return list(self._changes)[len(self._changes) - missing:]
+
 ###################################################################
 #
 # The base class representation of a graph with all the interface
@@ -15,12 +69,55 @@ class Graph(abc.ABC):
     def __init__(self, numVertices, directed=False):
         self.numVertices = numVertices
         self.directed = directed
+        self.changes = ChangeLog()
+
+    def _check_vertex(self, v):
+        if v < 0 or v >= self.numVertices:
+            raise ValueError("Cannot access vertex %d" % v)
+
+    def _check_edge(self, v1, v2):
+        if v1 >= self.numVertices or v2 >= self.numVertices or v1 < 0 or v2 < 0:
+            raise ValueError("Vertices %d and %d are out of bounds" % (v1, v2))
+
+        if not self.has_edge(v1, v2):
+            raise ValueError("There is no edge between %d and %d" % (v1, v2))
 
     @abc.abstractclassmethod
     def add_edge(self, v1, v2, weight):
         # when not implemented yet, can put "pass" keyword in the method
         pass
 
+    @abc.abstractclassmethod
+    def remove_edge(self, v1, v2):
+        # raise a ValueError when there is no such edge
+        pass
+
+    @abc.abstractclassmethod
+    def remove_vertex(self, v):
+        # remove all the edges going to or coming from v. The vertex
+        # ids don't change, v stays in the graph without any edge
+        pass
+
+    @abc.abstractclassmethod
+    def update_weight(self, v1, v2, weight):
+        # raise a ValueError when there is no such edge
+        pass
+
+    @abc.abstractclassmethod
+    def has_edge(self, v1, v2):
+        pass
+
+    def add_edges(self, v1s, v2s, weights=None):
+        # bulk insert path used by the file loaders, by default it's
+        # only one add_edge call per edge; backends which can do better
+        # (i.e a vectorized write) override it
+        if weights is None:
+            for v1, v2 in zip(v1s, v2s):
+                self.add_edge(int(v1), int(v2))
+        else:
+            for v1, v2, weight in zip(v1s, v2s, weights):
+                self.add_edge(int(v1), int(v2), weight)
+
     @abc.abstractclassmethod
     def get_adjacent_vertices(self, v):
         # retrieve all adjacent vertices for specified vertex
@@ -33,6 +130,8 @@ class Graph(abc.ABC):
 
     @abc.abstractclassmethod
     def get_edge_weight(self, v1, v2):
+        # 0 when there is no edge, has_edge tells it apart from an
+        # edge of weight 0
         pass
 
     @abc.abstractclassmethod
@@ -40,73 +139,292 @@ class Graph(abc.ABC):
         # to use as a debugger
         pass
 
+    def to_csr(self):
+        # Compressed sparse row form of the graph, a tuple of 3 numpy
+        # arrays (indptr, indices, weights): the neighbors of v are
+        # indices[indptr[v]:indptr[v + 1]], sorted, and weights holds
+        # the matching edge weights. Used by the compiled kernels
+        indptr = np.zeros(self.numVertices + 1, dtype=np.int64)
+        indices = []
+        weights = []
+        for v in range(self.numVertices):
+            adjacent_vertices = self.get_adjacent_vertices(v)
+            indptr[v + 1] = indptr[v] + len(adjacent_vertices)
+            for neighbor in adjacent_vertices:
+                indices.append(neighbor)
+                weights.append(self.get_edge_weight(v, neighbor))
+
+        return (indptr, np.array(indices, dtype=np.int32),
+                np.array(weights, dtype=float))
+
 ######################################################################
 #
 # Represents a graph as an adjacent matrix. A cell in the matrix has
 # a value when there exists an edge between the vertex represented by
 # the row and a column numbers
 # Weighted graphs can hold values > 1 in the matrix cells
-# A value of 0 in the cell indicates that there is no edge
+# A sentinel value in the cell indicates that there is no edge, so an
+# edge can have a weight of 0. The sentinel depends on the dtype of
+# the matrix:
+#   - float64 (default), float32: NaN (NO_EDGE)
+#   - uint8, uint16, int32...: the biggest value of the type, which
+#     can't be used as a weight
+#   - bool: False, the graph is unweighted (all weights are 1)
+#   - "bits": unweighted too, and each row is packed 8 cells per byte
+# A smaller dtype divides the size of the matrix (V x V cells) by up
+# to 8 (uint8, bool) or 64 (bits), so more of it stays in the cache
+# during the row scans of get_adjacent_vertices and get_indegree
 #
 ######################################################################
 
+NO_EDGE = np.nan
+
+
+def _check_non_negative(weights):
+    # weights is a single weight or an array of them. NaN is the
+    # NO_EDGE marker so it's not a weight either, and unlike "< 0" the
+    # "not >= 0" test catches it
+    if not np.all(np.asarray(weights) >= 0):
+        raise ValueError("An edge cannot have a weight < 0 or NaN")
+
+
+def _last_edges(v1s, v2s, numVertices):
+    # Indexes of the last occurrence of every distinct edge of the
+    # arrays, sorted by source then destination. np.unique keeps the
+    # first occurrence, so it's run on the reversed edges
+    keys = v1s * numVertices + v2s
+    _, last = np.unique(keys[::-1], return_index=True)
+    return len(keys) - 1 - last
+
 
 class AdjacencyMatrixGraph(Graph):
 
-    def __init__(self, numVertices, directed=False):
+    def __init__(self, numVertices, directed=False, dtype=np.float64):
         super(AdjacencyMatrixGraph, self).__init__(numVertices, directed)
-        self.matrix = np.zeros((numVertices, numVertices))
+
+        self.packed = isinstance(dtype, str) and dtype == "bits"
+        if self.packed:
+            self.dtype = np.dtype(np.uint8)
+            self.weighted = False
+            self.no_edge = 0
+            self.matrix = np.zeros((numVertices, (numVertices + 7) // 8), dtype=np.uint8)
+            return
+
+        self.dtype = np.dtype(dtype)
+        if self.dtype == np.bool_:
+            self.weighted = False
+            self.no_edge = False
+        elif np.issubdtype(self.dtype, np.integer):
+            self.weighted = True
+            self.no_edge = np.iinfo(self.dtype).max
+        elif np.issubdtype(self.dtype, np.floating):
+            self.weighted = True
+            self.no_edge = NO_EDGE
+        else:
+            raise ValueError("An adjacency matrix cannot be of dtype %s" % self.dtype)
+
+        self.matrix = np.full((numVertices, numVertices), self.no_edge, dtype=self.dtype)
+
+    def _edges_in(self, cells):
+        # boolean mask of the cells holding an edge (not for "bits")
+        if self.dtype == np.bool_:
+            return cells
+        if self.weighted and np.issubdtype(self.dtype, np.floating):
+            return ~np.isnan(cells)
+        return cells != self.no_edge
+
+    def _check_weights(self, weights):
+        # weights is a single weight or an array of them
+        _check_non_negative(weights)
+
+        if not self.weighted:
+            if np.any(weights != 1):
+                raise ValueError(
+                    "An unweighted adjacency matrix cannot represent edge weight != 1")
+        elif np.issubdtype(self.dtype, np.integer):
+            if np.any(weights >= self.no_edge) or np.any(np.asarray(weights) % 1 != 0):
+                raise ValueError("Edge weights must be integers < %d for a matrix of %s"
+                                 % (self.no_edge, self.dtype))
+
+    def _write(self, v1s, v2s, weights):
+        # v1s, v2s are vertices or arrays of vertices, weights is None
+        # to remove the edges
+        if self.packed:
+            bits = (0x80 >> (np.asarray(v2s) & 7)).astype(np.uint8)
+            if weights is None:
+                np.bitwise_and.at(self.matrix, (v1s, np.asarray(v2s) >> 3), ~bits)
+            else:
+                np.bitwise_or.at(self.matrix, (v1s, np.asarray(v2s) >> 3), bits)
+        elif weights is None:
+            self.matrix[v1s, v2s] = self.no_edge
+        else:
+            self.matrix[v1s, v2s] = True if self.dtype == np.bool_ else weights
+
+    def _row(self, v):
+        # boolean mask of the vertices adjacent to v
+        if self.packed:
+            return np.unpackbits(self.matrix[v], count=self.numVertices).view(np.bool_)
+        return self._edges_in(self.matrix[v])
+
+    def _column(self, v):
+        # boolean mask of the vertices which v is adjacent to
+        if self.packed:
+            return (self.matrix[:, v >> 3] & (0x80 >> (v & 7))) != 0
+        return self._edges_in(self.matrix[:, v])
 
     def add_edge(self, v1, v2, weight=1):
         # check that vertices we passed are valid (not outside the bounds of the graph)
         if v1 >= self.numVertices or v2 >= self.numVertices or v1 < 0 or v2 < 0:
             raise ValueError("Vertices %d and %d are out of bounds" % (v1, v2))
 
-        # sanity check on weight (it"s possible but not using it here)
-        if weight < 1:
-            raise ValueError("An edge cannot have a weight < 1")
+        # sanity check on weight, djikstra needs weights >= 0 and the
+        # weight must fit in the dtype of the matrix
+        self._check_weights(weight)
 
-        self.matrix[v1][v2] = weight
+        self._write(v1, v2, weight)
 
         # in case of undirected graph, the adjency matrix is symetrical
         if self.directed == False:
-            self.matrix[v2][v1] = weight
+            self._write(v2, v1, weight)
+
+        self.changes.record("add_edge", v1, v2, weight)
+
+    def add_edges(self, v1s, v2s, weights=None):
+        # same checks than add_edge but all the edges are written with
+        # a single fancy-indexing assignment instead of a python loop
+        v1s = np.asarray(v1s, dtype=np.intp)
+        v2s = np.asarray(v2s, dtype=np.intp)
+        if v1s.shape != v2s.shape:
+            raise ValueError("Sources and destinations must have the same size")
+
+        if v1s.size == 0:
+            return
+
+        if (min(v1s.min(), v2s.min()) < 0
+                or max(v1s.max(), v2s.max()) >= self.numVertices):
+            raise ValueError("Some vertices are out of bounds")
+
+        changed = (v1s, v2s, weights)
+        if weights is None:
+            weights = 1
+        else:
+            weights = np.asarray(weights)
+            if weights.shape != v1s.shape:
+                raise ValueError("There must be one weight per edge")
+            self._check_weights(weights)
+
+        if self.directed == False:
+            # both directions of an edge are written next to each other
+            # so, as with add_edge, the last edge given for a pair wins
+            v1s, v2s = (np.column_stack((v1s, v2s)).ravel(),
+                        np.column_stack((v2s, v1s)).ravel())
+            weights = np.repeat(weights, 2) if np.ndim(weights) else weights
+
+        if np.ndim(weights):
+            # numpy doesn't tell which value a fancy-indexing assignment
+            # keeps for a cell given twice, so only the last edge given
+            # for each cell is written
+            last = _last_edges(v1s, v2s, self.numVertices)
+            v1s, v2s, weights = v1s[last], v2s[last], weights[last]
+
+        self._write(v1s, v2s, weights)
+
+        self.changes.record("add_edges", *changed)
+
+    def remove_edge(self, v1, v2):
+        self._check_edge(v1, v2)
+
+        self._write(v1, v2, None)
+        if self.directed == False:
+            self._write(v2, v1, None)
+
+        self.changes.record("remove_edge", v1, v2)
+
+    def remove_vertex(self, v):
+        self._check_vertex(v)
+
+        everyone = np.arange(self.numVertices)
+        self._write(v, everyone, None)
+        self._write(everyone, v, None)
+
+        self.changes.record("remove_vertex", v)
+
+    def update_weight(self, v1, v2, weight):
+        self._check_edge(v1, v2)
+        self._check_weights(weight)
+
+        self._write(v1, v2, weight)
+        if self.directed == False:
+            self._write(v2, v1, weight)
+
+        self.changes.record("update_weight", v1, v2, weight)
+
+    def has_edge(self, v1, v2):
+        if self.packed:
+            return bool(self.matrix[v1, v2 >> 3] & (0x80 >> (v2 & 7)))
+        return bool(self._edges_in(self.matrix[v1][v2]))
 
     def get_adjacent_vertices(self, v):
         # check if v is a valid vertex
         if v < 0 or v >= self.numVertices:
             raise ValueError("Cannot access vertex %d" % v)
 
-        # adjacent_vertice will be populated
-        adjacent_vertices = []
-        for i in range(self.numVertices):
-            # if any cell have a value > 0
-            #   then the vertex i is adjacent to v
-            if self.matrix[v][i] > 0:
-                adjacent_vertices.append(i)
-
-        return adjacent_vertices
+        # the columns of the row v which hold an edge are the vertices
+        # adjacent to v
+        return np.flatnonzero(self._row(v)).tolist()
 
     def get_indegree(self, v):
         # check if v is a valid vertex
         if v < 0 or v >= self.numVertices:
             raise ValueError("Cannot access vertex %d" % v)
 
-        indegree = 0
-        for i in range(self.numVertices):
-            if self.matrix[i][v] > 0:
-                indegree = indegree + 1
-
-        return indegree
+        return int(np.count_nonzero(self._column(v)))
 
     def get_edge_weight(self, v1, v2):
-        return self.matrix[v1][v2]
+        # The weight is given back as a python number, so the algorithms
+        # which add up weights (djikstra) don't overflow the small
+        # integer dtypes of the matrix
+        if not self.has_edge(v1, v2):
+            return 0
+        if not self.weighted:
+            return 1
+        return self.matrix[v1][v2].item()
 
     def display(self):
         for i in range(self.numVertices):
             for v in self.get_adjacent_vertices(i):
                 print(i, "-->", v)
 
+    def to_csr(self):
+        indptr = np.zeros(self.numVertices + 1, dtype=np.int64)
+
+        if self.packed:
+            # unpacked by blocks of rows to keep the memory bounded
+            rows = []
+            cols = []
+            for start in range(0, self.numVertices, 4096):
+                block = np.unpackbits(self.matrix[start:start + 4096], axis=1,
+                                      count=self.numVertices)
+                block_rows, block_cols = np.nonzero(block)
+                rows.append(block_rows + start)
+                cols.append(block_cols)
+            rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+            cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64)
+            weights = np.ones(len(rows))
+        else:
+            # np.nonzero walks the matrix row by row, so the neighbors
+            # come out already grouped by vertex and sorted
+            rows, cols = np.nonzero(self._edges_in(self.matrix))
+            if self.weighted:
+                weights = self.matrix[rows, cols].astype(float)
+            else:
+                weights = np.ones(len(rows))
+
+        # the weights are float64 whatever the dtype, the kernels add
+        # them up without overflowing
+        np.cumsum(np.bincount(rows, minlength=self.numVertices), out=indptr[1:])
+        return indptr, cols.astype(np.int32), weights
+
 
 ######################################################################
 #
@@ -126,6 +444,9 @@ class Node:
 
         self.adjacency_set.add(v)
 
+    def remove_edge(self, v):
+        self.adjacency_set.discard(v)
+
     def get_adjacent_vertices(self):
         return sorted(self.adjacency_set)
 
@@ -160,6 +481,38 @@ class AdjacencySetGraph(Graph):
         if self.directed == False:
             self.vertex_list[v2].add_edge(v1)
 
+        self.changes.record("add_edge", v1, v2, weight)
+
+    def remove_edge(self, v1, v2):
+        self._check_edge(v1, v2)
+
+        self.vertex_list[v1].remove_edge(v2)
+        if self.directed == False:
+            self.vertex_list[v2].remove_edge(v1)
+
+        self.changes.record("remove_edge", v1, v2)
+
+    def remove_vertex(self, v):
+        self._check_vertex(v)
+
+        self.vertex_list[v].adjacency_set.clear()
+        for node in self.vertex_list:
+            node.remove_edge(v)
+
+        self.changes.record("remove_vertex", v)
+
+    def update_weight(self, v1, v2, weight):
+        self._check_edge(v1, v2)
+
+        # the only weight an adjacency set can hold is 1, which the
+        # edge already has
+        if weight != 1:
+            raise ValueError(
+                "An adjacency set cannot represent edge weight  >1")
+
+    def has_edge(self, v1, v2):
+        return v2 in self.vertex_list[v1].adjacency_set
+
     def get_adjacent_vertices(self, v):
         if v < 0 or v >= self.numVertices:
             raise ValueError("Cannot access vertex %d" % v)
@@ -180,34 +533,284 @@ class AdjacencySetGraph(Graph):
 
     def get_edge_weight(self, v1, v2):
         # adjency set graph can't represent weight graph so it always return 1
-        return 1
+        return 1 if self.has_edge(v1, v2) else 0
+
+    def display(self):
+        for i in range(self.numVertices):
+            for v in self.get_adjacent_vertices(i):
+                print(i, "-->", v)
+
+
+
+######################################################################
+#
+# Represents a graph in compressed sparse row (CSR) form: the
+# neighbors of all the vertices are stored one after the other in a
+# single array, and indptr[v] gives where the neighbors of v start.
+# It takes O(V + E) memory instead of O(V^2) for the matrix, and the
+# arrays can be handed as is to the compiled kernels.
+# The new edges are buffered and merged in the arrays the next time
+# the graph is read, so adding edges one by one stays cheap.
+# A removed edge is only tombstoned (its weight becomes NO_EDGE) and
+# the arrays are compacted once a COMPACTION_RATIO of the edges are
+# tombstones, or when the arrays are handed out by to_csr
+#
+######################################################################
+
+
+class CSRGraph(Graph):
+    COMPACTION_RATIO = 0.25
+
+    def __init__(self, numVertices, directed=False):
+        super(CSRGraph, self).__init__(numVertices, directed)
+
+        self.indptr = np.zeros(numVertices + 1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0)
+
+        # list of (sources, destinations, weights) arrays not yet merged
+        self._pending = []
+        self._indegrees = None
+        self._num_tombstones = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # a lock can't be pickled, i.e to send the graph to the worker
+        # processes of query_service
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add_edge(self, v1, v2, weight=1):
+        if v1 >= self.numVertices or v2 >= self.numVertices or v1 < 0 or v2 < 0:
+            raise ValueError("Vertices %d and %d are out of bounds" % (v1, v2))
+
+        _check_non_negative(weight)
+
+        self._pending.append(([v1], [v2], [weight]))
+
+        if self.directed == False:
+            self._pending.append(([v2], [v1], [weight]))
+
+        self.changes.record("add_edge", v1, v2, weight)
+
+    def add_edges(self, v1s, v2s, weights=None):
+        v1s = np.asarray(v1s, dtype=np.int64)
+        v2s = np.asarray(v2s, dtype=np.int64)
+        if v1s.shape != v2s.shape:
+            raise ValueError("Sources and destinations must have the same size")
+
+        if v1s.size == 0:
+            return
+
+        if (min(v1s.min(), v2s.min()) < 0
+                or max(v1s.max(), v2s.max()) >= self.numVertices):
+            raise ValueError("Some vertices are out of bounds")
+
+        changed = (v1s, v2s, weights)
+        if weights is None:
+            weights = np.ones(v1s.shape)
+        else:
+            weights = np.asarray(weights, dtype=float)
+            if weights.shape != v1s.shape:
+                raise ValueError("There must be one weight per edge")
+            _check_non_negative(weights)
+
+        if self.directed == False:
+            # both directions of an edge are kept next to each other so
+            # the last edge given for a pair wins once _merge_pending
+            # drops the duplicates, as with add_edge
+            v1s, v2s = (np.column_stack((v1s, v2s)).ravel(),
+                        np.column_stack((v2s, v1s)).ravel())
+            weights = np.repeat(weights, 2)
+
+        self._pending.append((v1s, v2s, weights))
+
+        self.changes.record("add_edges", *changed)
+
+    def _rows(self):
+        # source vertex of every entry of indices
+        return np.repeat(np.arange(self.numVertices, dtype=np.int64),
+                         np.diff(self.indptr))
+
+    def _build(self, sources, destinations, weights):
+        # sources must be sorted. All the new arrays are made before
+        # any of them is set on the graph
+        indptr = np.zeros(self.numVertices + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=self.numVertices), out=indptr[1:])
+        indices = destinations.astype(np.int32)
+
+        self.indptr, self.indices, self.weights = indptr, indices, weights
+        self._indegrees = None
+        self._num_tombstones = 0
+
+    def _merge_pending(self):
+        # Rebuild the arrays from the current edges followed by the
+        # pending ones. As for the matrix, an edge added twice keeps
+        # the last weight. The tombstones are dropped on the way.
+        # Searches can read the graph from several threads (see
+        # query_service), so the merge is done under a lock and the
+        # pending edges are only cleared once the new arrays are set:
+        # a thread which finds nothing pending can read the arrays
+        if not self._pending:
+            return
+
+        with self._lock:
+            # another thread may have merged them while we waited
+            if not self._pending:
+                return
+
+            pending = self._pending
+            alive = ~np.isnan(self.weights)
+            sources = np.concatenate([self._rows()[alive]] +
+                                     [np.asarray(s, dtype=np.int64)
+                                      for s, _, _ in pending])
+            destinations = np.concatenate([self.indices[alive].astype(np.int64)] +
+                                          [np.asarray(d, dtype=np.int64)
+                                           for _, d, _ in pending])
+            weights = np.concatenate([self.weights[alive]] +
+                                     [np.asarray(w, dtype=float)
+                                      for _, _, w in pending])
+
+            last = _last_edges(sources, destinations, self.numVertices)
+            self._build(sources[last], destinations[last], weights[last])
+            self._pending = []
+
+    def compact(self):
+        # Drop the tombstones from the arrays
+        self._merge_pending()
+        if self._num_tombstones == 0:
+            return
+
+        with self._lock:
+            if self._num_tombstones == 0:
+                return
+
+            alive = ~np.isnan(self.weights)
+            self._build(self._rows()[alive], self.indices[alive], self.weights[alive])
+
+    def _tombstone(self, positions):
+        # positions: indexes in the arrays of the edges to remove. An
+        # undirected self-loop gives the same position twice, it must
+        # only be counted once
+        positions = np.unique(positions)
+        removed = np.count_nonzero(~np.isnan(self.weights[positions]))
+        self.weights[positions] = NO_EDGE
+        self._num_tombstones = self._num_tombstones + removed
+        self._indegrees = None
+
+        if self._num_tombstones > self.COMPACTION_RATIO * len(self.weights):
+            self.compact()
+
+    def _find_edge(self, v1, v2):
+        # index of the edge v1 -> v2 in the arrays, -1 when there is
+        # no such edge (or it's a tombstone)
+        self._merge_pending()
+        start, end = self.indptr[v1], self.indptr[v1 + 1]
+        i = start + np.searchsorted(self.indices[start:end], v2)
+        if i < end and self.indices[i] == v2 and not np.isnan(self.weights[i]):
+            return i
+        return -1
+
+    def remove_edge(self, v1, v2):
+        self._check_edge(v1, v2)
+
+        positions = [self._find_edge(v1, v2)]
+        if self.directed == False:
+            positions.append(self._find_edge(v2, v1))
+        self._tombstone(positions)
+
+        self.changes.record("remove_edge", v1, v2)
+
+    def remove_vertex(self, v):
+        self._check_vertex(v)
+        self._merge_pending()
+
+        outgoing = np.arange(self.indptr[v], self.indptr[v + 1])
+        incoming = np.flatnonzero(self.indices == v)
+        self._tombstone(np.concatenate((outgoing, incoming)))
+
+        self.changes.record("remove_vertex", v)
+
+    def update_weight(self, v1, v2, weight):
+        self._check_edge(v1, v2)
+
+        _check_non_negative(weight)
+
+        self.weights[self._find_edge(v1, v2)] = weight
+        if self.directed == False:
+            self.weights[self._find_edge(v2, v1)] = weight
+
+        self.changes.record("update_weight", v1, v2, weight)
+
+    def has_edge(self, v1, v2):
+        return self._find_edge(v1, v2) >= 0
+
+    def get_adjacent_vertices(self, v):
+        if v < 0 or v >= self.numVertices:
+            raise ValueError("Cannot access vertex %d" % v)
+
+        self._merge_pending()
+        start, end = self.indptr[v], self.indptr[v + 1]
+        if self._num_tombstones == 0:
+            return self.indices[start:end].tolist()
+
+        return self.indices[start:end][~np.isnan(self.weights[start:end])].tolist()
+
+    def get_indegree(self, v):
+        if v < 0 or v >= self.numVertices:
+            raise ValueError("Cannot access vertex %d" % v)
+
+        self._merge_pending()
+        # all the indegrees are counted at once and kept until the
+        # next change of the graph
+        if self._indegrees is None:
+            alive = ~np.isnan(self.weights)
+            self._indegrees = np.bincount(self.indices[alive], minlength=self.numVertices)
+
+        return int(self._indegrees[v])
+
+    def get_edge_weight(self, v1, v2):
+        # Same as the matrix, 0 means there is no edge
+        i = self._find_edge(v1, v2)
+        return self.weights[i] if i >= 0 else 0
 
     def display(self):
         for i in range(self.numVertices):
             for v in self.get_adjacent_vertices(i):
                 print(i, "-->", v)
 
+    def to_csr(self):
+        # the kernels don't know about the tombstones
+        self.compact()
+        return self.indptr, self.indices, self.weights
+
 
 # test adjency matrix graph with 4 vertex
-numVertices = 4
-# Adjency matrix representation
-# g = AdjacencyMatrixGraph(numVertices)
+if __name__ == "__main__":
+    numVertices = 4
+    # Adjency matrix representation
+    # g = AdjacencyMatrixGraph(numVertices)
 
-# Adjency set representation
-g = AdjacencySetGraph(numVertices, directed=False)
+    # Adjency set representation
+    g = AdjacencySetGraph(numVertices, directed=False)
 
-g.add_edge(0, 1)
-g.add_edge(0, 2)
-g.add_edge(2, 3)
+    g.add_edge(0, 1)
+    g.add_edge(0, 2)
+    g.add_edge(2, 3)
 
-for i in range(numVertices):
-    print("Adjacent to : ", i, g.get_adjacent_vertices(i))
+    for i in range(numVertices):
+        print("Adjacent to : ", i, g.get_adjacent_vertices(i))
 
-for i in range(numVertices):
-    print("Indegree to : ", i, g.get_indegree(i))
+    for i in range(numVertices):
+        print("Indegree to : ", i, g.get_indegree(i))
 
-for i in range(numVertices):
-    for j in g.get_adjacent_vertices(i):
-        print("Edge weight ", i, " ", j, " weight: ", g.get_edge_weight(i, j))
+    for i in range(numVertices):
+        for j in g.get_adjacent_vertices(i):
+            print("Edge weight ", i, " ", j, " weight: ", g.get_edge_weight(i, j))
 
-g.display()
+    g.display()
@@ -0,0 +1,163 @@
+##############################################################
+#
+# Opt-in instrumentation of the graph algorithms.
+# Nothing is recorded unless a profile is active:
+#
+#   with instrumentation.profile() as p:
+#       djikstra.build_distance_table(g, 0)
+#   print(p.calls[0])
+#
+# Each instrumented algorithm call gets its own Stats, holding
+# counters (neighbor scans, edge relaxations, heap pushes/pops,
+# stale pops, heap rebuilds, visited vertices), the time of each
+# phase of the algorithm and the time spent in the graph methods
+# and in the priority queue.
+# When no profile is active an algorithm only pays one lookup at
+# its start and an "if stats is not None" in its loops.
+#
+##############################################################
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+# The active profile is per thread, so a profile never records the
+# calls made concurrently by other threads
+_local = threading.local()
+
+COUNTERS = (
+    "neighbor_scans",
+    "edge_weight_lookups",
+    "indegree_lookups",
+    "edge_relaxations",
+    "heap_pushes",
+    "heap_pops",
+    "stale_pops",
+    "heap_rebuilds",
+    "visited_vertices",
+)
+
+
+class Stats:
+    # Counters and timings of a single algorithm call
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        for counter in COUNTERS:
+            setattr(self, counter, 0)
+
+        # phase name -> seconds, filled by mark()
+        self.phases = {}
+        # graph method or "priority_queue" -> seconds
+        self.timings = {}
+        self._last_mark = perf_counter()
+
+    def mark(self, phase):
+        # The time elapsed since the previous mark (or since the
+        # start of the call) is attributed to the phase
+        now = perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0) + now - self._last_mark
+        self._last_mark = now
+
+    def add_time(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0) + seconds
+
+    def merge(self, other):
+        for counter in COUNTERS:
+            setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+        for phase, seconds in other.phases.items():
+            self.phases[phase] = self.phases.get(phase, 0) + seconds
+        for name, seconds in other.timings.items():
+            self.add_time(name, seconds)
+
+    def as_dict(self):
+        result = {"algorithm": self.algorithm}
+        for counter in COUNTERS:
+            result[counter] = getattr(self, counter)
+        result["phases"] = dict(self.phases)
+        result["timings"] = dict(self.timings)
+        return result
+
+    def __repr__(self):
+        return "Stats(%s)" % ", ".join(
+            "%s=%r" % (key, value) for key, value in self.as_dict().items())
+
+
+class Profile:
+    # Collects the Stats of every algorithm call made while it is
+    # active (see profile())
+
+    def __init__(self):
+        self.calls = []
+
+    def total(self):
+        # Sum of all the calls, or of the calls of one algorithm
+        return self.total_of(None)
+
+    def total_of(self, algorithm):
+        total = Stats(algorithm or "all")
+        for stats in self.calls:
+            if algorithm is None or stats.algorithm == algorithm:
+                total.merge(stats)
+        return total
+
+
+######################################################################
+#
+# Wraps a graph to count and time the calls to its hot methods, the
+# other attributes (numVertices, matrix...) are forwarded as is
+#
+######################################################################
+class InstrumentedGraph:
+
+    def __init__(self, graph, stats):
+        self._graph = graph
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._graph, name)
+
+    def get_adjacent_vertices(self, v):
+        start = perf_counter()
+        adjacent_vertices = self._graph.get_adjacent_vertices(v)
+        self._stats.add_time("get_adjacent_vertices", perf_counter() - start)
+        self._stats.neighbor_scans += 1
+        return adjacent_vertices
+
+    def get_edge_weight(self, v1, v2):
+        start = perf_counter()
+        weight = self._graph.get_edge_weight(v1, v2)
+        self._stats.add_time("get_edge_weight", perf_counter() - start)
+        self._stats.edge_weight_lookups += 1
+        return weight
+
+    def get_indegree(self, v):
+        start = perf_counter()
+        indegree = self._graph.get_indegree(v)
+        self._stats.add_time("get_indegree", perf_counter() - start)
+        self._stats.indegree_lookups += 1
+        return indegree
+
+
+def start(algorithm, graph):
+    # Called at the start of an instrumented algorithm. Returns the
+    # graph to work on and the Stats to fill, when no profile is
+    # active it's the graph itself and None
+    active = getattr(_local, "profile", None)
+    if active is None:
+        return graph, None
+
+    stats = Stats(algorithm)
+    active.calls.append(stats)
+    return InstrumentedGraph(graph, stats), stats
+
+
+@contextmanager
+def profile():
+    # Record the algorithm calls made in this block, profiles can be
+    # nested, the inner one then hides the outer one
+    previous = getattr(_local, "profile", None)
+    _local.profile = Profile()
+    try:
+        yield _local.profile
+    finally:
+        _local.profile = previous
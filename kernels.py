@@ -0,0 +1,275 @@
+##############################################################
+#
+# Compiled kernels for Djikstra, BFS (shortest_path), Prim and the
+# topological sort.
+# The kernels work on the CSR arrays of the graph (see
+# Graph.to_csr) instead of calling get_adjacent_vertices and
+# get_edge_weight for every vertex. When numba is installed they
+# are JIT compiled, otherwise they run as plain python functions,
+# which gives the same results, only slower.
+# They are selected with backend="jit" on the algorithms:
+#
+#   djikstra.build_distance_table(g, 0, backend="jit")
+#
+##############################################################
+import heapq
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ("python", "jit")
+
+# True when the kernels are really compiled
+JIT_ENABLED = numba is not None
+
+
+def _jit(function):
+    if numba is None:
+        return function
+    # nogil lets the kernels run in parallel from a thread pool
+    return numba.njit(cache=True, nogil=True)(function)
+
+
+def use_jit(backend):
+    # Check the backend parameter of an algorithm, True when the
+    # kernel must be used
+    if backend not in BACKENDS:
+        raise ValueError("Unknown backend %s, expected one of %s"
+                         % (backend, ", ".join(BACKENDS)))
+    return backend == "jit"
+
+
+@_jit
+def djikstra_kernel(indptr, indices, weights, source):
+    # Returns the arrays (distance, previous) of the vertices, a
+    # vertex which can't be reached has a distance of inf and a
+    # previous vertex of -1
+    num_vertices = len(indptr) - 1
+    distance = np.full(num_vertices, np.inf)
+    previous = np.full(num_vertices, -1, dtype=np.int64)
+    settled = np.zeros(num_vertices, dtype=np.bool_)
+
+    distance[source] = 0.0
+    previous[source] = source
+
+    # the heap can hold the same vertex several times, only the entry
+    # with the smallest distance is processed, the others are skipped
+    heap = [(0.0, np.int64(source))]
+    while len(heap) > 0:
+        current_distance, current_vertex = heapq.heappop(heap)
+        if settled[current_vertex]:
+            continue
+        settled[current_vertex] = True
+
+        for i in range(indptr[current_vertex], indptr[current_vertex + 1]):
+            neighbor = np.int64(indices[i])
+            new_distance = current_distance + weights[i]
+            if new_distance < distance[neighbor]:
+                distance[neighbor] = new_distance
+                previous[neighbor] = current_vertex
+                heapq.heappush(heap, (new_distance, neighbor))
+
+    return distance, previous
+
+
+@_jit
+def bfs_kernel(indptr, indices, source):
+    # Same as djikstra_kernel for an unweighted graph, the distance is
+    # the number of hops and -1 for a vertex which can't be reached
+    num_vertices = len(indptr) - 1
+    distance = np.full(num_vertices, -1, dtype=np.int64)
+    previous = np.full(num_vertices, -1, dtype=np.int64)
+
+    # every vertex is queued at most once, so a plain array is enough
+    queue = np.empty(num_vertices, dtype=np.int64)
+    head = 0
+    tail = 1
+    queue[0] = source
+    distance[source] = 0
+    previous[source] = source
+
+    while head < tail:
+        current_vertex = queue[head]
+        head += 1
+
+        for i in range(indptr[current_vertex], indptr[current_vertex + 1]):
+            neighbor = indices[i]
+            if distance[neighbor] < 0:
+                distance[neighbor] = distance[current_vertex] + 1
+                previous[neighbor] = current_vertex
+                queue[tail] = neighbor
+                tail += 1
+
+    return distance, previous
+
+
+@_jit
+def prim_kernel(indptr, indices, weights, source):
+    # Returns the array of the parent of each vertex in the spanning
+    # tree, in the order the vertices were added to the tree. The
+    # source and the vertices not reached have a parent of -1
+    num_vertices = len(indptr) - 1
+    best = np.full(num_vertices, np.inf)
+    parent = np.full(num_vertices, -1, dtype=np.int64)
+    visited = np.zeros(num_vertices, dtype=np.bool_)
+    order = np.empty(num_vertices, dtype=np.int64)
+    num_visited = 0
+
+    best[source] = 0.0
+    heap = [(0.0, np.int64(source))]
+    while len(heap) > 0:
+        _, current_vertex = heapq.heappop(heap)
+        if visited[current_vertex]:
+            continue
+        visited[current_vertex] = True
+        order[num_visited] = current_vertex
+        num_visited += 1
+
+        for i in range(indptr[current_vertex], indptr[current_vertex + 1]):
+            neighbor = np.int64(indices[i])
+            if not visited[neighbor] and weights[i] < best[neighbor]:
+                best[neighbor] = weights[i]
+                parent[neighbor] = current_vertex
+                heapq.heappush(heap, (weights[i], neighbor))
+
+    return parent, order[:num_visited]
+
+
+@_jit
+def topological_sort_kernel(indptr, indices):
+    # Kahn's algorithm. Returns the sorted vertices, if the graph has a
+    # cycle the array is shorter than the number of vertices
+    num_vertices = len(indptr) - 1
+    indegree = np.zeros(num_vertices, dtype=np.int64)
+    for i in range(len(indices)):
+        indegree[indices[i]] += 1
+
+    queue = np.empty(num_vertices, dtype=np.int64)
+    tail = 0
+    for v in range(num_vertices):
+        if indegree[v] == 0:
+            queue[tail] = v
+            tail += 1
+
+    head = 0
+    while head < tail:
+        vertex = queue[head]
+        head += 1
+
+        for i in range(indptr[vertex], indptr[vertex + 1]):
+            neighbor = indices[i]
+            indegree[neighbor] -= 1
+            if indegree[neighbor] == 0:
+                queue[tail] = neighbor
+                tail += 1
+
+    return queue[:tail]
+
+
+@_jit
+def _find(parent, v):
+    # Root of v in the union-find forest, with path halving
+    while parent[v] != v:
+        parent[v] = parent[parent[v]]
+        v = parent[v]
+    return v
+
+
+@_jit
+def union_find_kernel(indptr, indices):
+    # Returns, for every vertex, the smallest vertex of its connected
+    # component. The direction of the edges is ignored
+    num_vertices = len(indptr) - 1
+    parent = np.arange(num_vertices)
+
+    for v in range(num_vertices):
+        for i in range(indptr[v], indptr[v + 1]):
+            root1 = _find(parent, v)
+            root2 = _find(parent, indices[i])
+            # the smallest vertex of a set is always its root
+            if root1 < root2:
+                parent[root2] = root1
+            elif root2 < root1:
+                parent[root1] = root2
+
+    for v in range(num_vertices):
+        parent[v] = _find(parent, v)
+
+    return parent
+
+
+@_jit
+def tarjan_kernel(indptr, indices):
+    # Iterative version of Tarjan's strongly connected components.
+    # Returns the component number of every vertex, in the order the
+    # components are completed. The recursion is replaced by a stack
+    # of (vertex, next edge to explore)
+    num_vertices = len(indptr) - 1
+    index = np.full(num_vertices, -1, dtype=np.int64)
+    lowlink = np.zeros(num_vertices, dtype=np.int64)
+    on_stack = np.zeros(num_vertices, dtype=np.bool_)
+    stack = np.empty(num_vertices, dtype=np.int64)
+    call_vertex = np.empty(num_vertices, dtype=np.int64)
+    call_edge = np.empty(num_vertices, dtype=np.int64)
+    labels = np.full(num_vertices, -1, dtype=np.int64)
+
+    counter = 0
+    num_components = 0
+    stack_size = 0
+
+    for root in range(num_vertices):
+        if index[root] >= 0:
+            continue
+
+        index[root] = counter
+        lowlink[root] = counter
+        counter += 1
+        stack[stack_size] = root
+        stack_size += 1
+        on_stack[root] = True
+        call_vertex[0] = root
+        call_edge[0] = indptr[root]
+        depth = 1
+
+        while depth > 0:
+            v = call_vertex[depth - 1]
+            edge = call_edge[depth - 1]
+
+            if edge < indptr[v + 1]:
+                call_edge[depth - 1] = edge + 1
+                w = indices[edge]
+                if index[w] < 0:
+                    # "recursive call" on w
+                    index[w] = counter
+                    lowlink[w] = counter
+                    counter += 1
+                    stack[stack_size] = w
+                    stack_size += 1
+                    on_stack[w] = True
+                    call_vertex[depth] = w
+                    call_edge[depth] = indptr[w]
+                    depth += 1
+                elif on_stack[w]:
+                    lowlink[v] = min(lowlink[v], index[w])
+            else:
+                # all the edges of v are explored, "return" from v
+                depth -= 1
+                if lowlink[v] == index[v]:
+                    while True:
+                        stack_size -= 1
+                        w = stack[stack_size]
+                        on_stack[w] = False
+                        labels[w] = num_components
+                        if w == v:
+                            break
+                    num_components += 1
+
+                if depth > 0:
+                    u = call_vertex[depth - 1]
+                    lowlink[u] = min(lowlink[u], lowlink[v])
+
+    return labels
@@ -5,17 +5,21 @@
 # Note : Works for connected graph AND disjoint graph (forest)
 #
 ##############################################################
+import instrumentation
 import priority_dict
 
 from graph import *
 
 
 def spanning_tree(graph):
+    # stats is None unless an instrumentation profile is active
+    graph, stats = instrumentation.start("kruskal", graph)
 
     # Instantiate the priority queue
     # Holds a mapping from a pair of edges to the edge weight
     # The edge weight is the priority edge
     priority_queue = priority_dict.priority_dict()
+    priority_queue.stats = stats
 
     for v in range(graph.numVertices):
         for neighbor in graph.get_adjacent_vertices(v):
@@ -23,6 +27,9 @@ def spanning_tree(graph):
             # Priority_queue is a dict(edge)= weight
             priority_queue[(v, neighbor)] = graph.get_edge_weight(v, neighbor)
 
+    if stats is not None:
+        stats.mark("queue_edges")
+
     visited_vertices = set()
 
     # Maps a node to all its adjacent nodes which are in the
@@ -40,6 +47,9 @@ def spanning_tree(graph):
         # Access the lowest cost edge
         v1, v2 = priority_queue.pop_smallest()
 
+        if stats is not None:
+            stats.edge_relaxations += 1
+
         # If we encountered the edge v2 to v1 before
         # => we continue to next
         if v1 in spanning_tree[v2]:
@@ -64,6 +74,10 @@ def spanning_tree(graph):
         visited_vertices.add(v1)
         visited_vertices.add(v2)
 
+    if stats is not None:
+        stats.visited_vertices = len(visited_vertices)
+        stats.mark("build_tree")
+
     print("Visited vertices: ", visited_vertices)
 
     # If we haven't visited all the vertices in this graph
@@ -76,6 +90,8 @@ def spanning_tree(graph):
             for value in spanning_tree[key]:
                 print(key, "-->", value)
 
+    return spanning_tree
+
 
 def has_cycle(spanning_tree):
 
@@ -106,16 +122,17 @@ def has_cycle(spanning_tree):
 
 
 # Test the implementation
-g = AdjacencyMatrixGraph(8, directed=False)
-g.add_edge(0, 1, 1)
-g.add_edge(1, 2, 2)
-g.add_edge(1, 3, 2)
-g.add_edge(2, 3, 2)
-g.add_edge(1, 4, 3)
-g.add_edge(3, 5, 1)
-g.add_edge(5, 4, 2)
-g.add_edge(3, 6, 1)
-g.add_edge(6, 7, 1)
-g.add_edge(7, 0, 1)
-
-spanning_tree(g)
+if __name__ == "__main__":
+    g = AdjacencyMatrixGraph(8, directed=False)
+    g.add_edge(0, 1, 1)
+    g.add_edge(1, 2, 2)
+    g.add_edge(1, 3, 2)
+    g.add_edge(2, 3, 2)
+    g.add_edge(1, 4, 3)
+    g.add_edge(3, 5, 1)
+    g.add_edge(5, 4, 2)
+    g.add_edge(3, 6, 1)
+    g.add_edge(6, 7, 1)
+    g.add_edge(7, 0, 1)
+
+    spanning_tree(g)
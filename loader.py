@@ -0,0 +1,213 @@
+##############################################################
+#
+# Streaming readers to load a graph from a file:
+#   - edge list (one "source destination [weight]" per line)
+#   - CSV (same thing but comma separated, with an optional header)
+#   - Matrix Market coordinate format (.mtx)
+# The file is parsed by fixed-size chunks of lines, each chunk is
+# turned into numpy arrays and directly handed to the bulk insert
+# path of the graph (add_edges), so the text of the whole file is
+# never held in memory.
+# The vertices of an edge list or a CSV can have any label (string
+# or int), they are remapped to dense ids 0..n-1 by a LabelIndex.
+#
+##############################################################
+from itertools import islice
+
+from graph import *
+
+DEFAULT_CHUNK_SIZE = 65536
+
+
+class LabelIndex:
+    # Maps arbitrary vertex labels to dense vertex ids, a new id is
+    # handed out each time an unknown label is met. The reverse
+    # mapping is a plain list so labels[id] gives back the label
+
+    def __init__(self):
+        self.ids = {}
+        self.labels = []
+
+    def __len__(self):
+        return len(self.labels)
+
+    def get_id(self, label):
+        # Labels are read as text from the files, so an int label
+        # can be looked up as well as its string
+        return self.ids[str(label)]
+
+    def get_label(self, vertex):
+        return self.labels[vertex]
+
+    def add(self, label):
+        vertex = self.ids.get(label)
+        if vertex is None:
+            vertex = len(self.labels)
+            self.ids[label] = vertex
+            self.labels.append(label)
+        return vertex
+
+    def remap(self, column):
+        # Only the distinct labels of the chunk go through the python
+        # dictionary, the remaining work is a vectorized gather
+        unique_labels, inverse = np.unique(column, return_inverse=True)
+        unique_ids = np.fromiter((self.add(str(label)) for label in unique_labels),
+                                 dtype=np.int32, count=len(unique_labels))
+        return unique_ids[inverse.reshape(-1)]
+
+
+def _read_chunks(lines, chunk_size, comments):
+    # Yield lists of at most chunk_size meaningful lines, blank lines
+    # and comments are dropped
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+
+        chunk = [line for line in chunk
+                 if line.strip() and not line.lstrip().startswith(comments)]
+        if chunk:
+            yield chunk
+
+
+def _parse_chunk(chunk, delimiter, columns):
+    # Turn a list of text lines into a 2d array of strings holding
+    # only the requested columns. The cells are stripped like the
+    # header names, so "a,b" and "a, b" give the same labels
+    table = np.loadtxt(chunk, dtype=str, delimiter=delimiter,
+                       usecols=columns, ndmin=2, comments=None)
+    return np.char.strip(table)
+
+
+def iter_edge_chunks(path, labels, delimiter=None, weighted=False,
+                     chunk_size=DEFAULT_CHUNK_SIZE, comments="#",
+                     skip_header=False, columns=(0, 1, 2)):
+    # Stream a delimited file and yield, for each chunk, a tuple of
+    # (sources, destinations, weights) numpy arrays where the vertex
+    # labels have been remapped through the LabelIndex.
+    # weights is None when the file is read as unweighted
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be >= 1")
+
+    columns = tuple(columns[:3] if weighted else columns[:2])
+
+    with open(path) as f:
+        if skip_header:
+            next(f, None)
+
+        for chunk in _read_chunks(f, chunk_size, comments):
+            table = _parse_chunk(chunk, delimiter, columns)
+
+            sources = labels.remap(table[:, 0])
+            destinations = labels.remap(table[:, 1])
+            weights = table[:, 2].astype(float) if weighted else None
+
+            yield sources, destinations, weights
+
+
+def _build_graph(path, graph_class, directed, labels, **kwargs):
+    # The number of vertices is only known once the whole file has
+    # been read, so the chunks are kept as compact id arrays (not as
+    # text) until the graph can be allocated
+    chunks = list(iter_edge_chunks(path, labels, **kwargs))
+
+    graph = graph_class(len(labels), directed=directed)
+    for sources, destinations, weights in chunks:
+        graph.add_edges(sources, destinations, weights)
+
+    return graph
+
+
+def load_edge_list(path, graph_class=AdjacencyMatrixGraph, directed=False,
+                   weighted=False, delimiter=None,
+                   chunk_size=DEFAULT_CHUNK_SIZE, comments="#"):
+    # Load a whitespace (or delimiter) separated edge list.
+    # Returns a tuple (graph, labels) where labels is the LabelIndex
+    # used to map the vertex labels of the file to the vertex ids
+    labels = LabelIndex()
+    graph = _build_graph(path, graph_class, directed, labels,
+                         delimiter=delimiter, weighted=weighted,
+                         chunk_size=chunk_size, comments=comments)
+    return graph, labels
+
+
+def load_csv(path, graph_class=AdjacencyMatrixGraph, directed=False,
+             source=0, destination=1, weight=None, header=True,
+             delimiter=",", chunk_size=DEFAULT_CHUNK_SIZE):
+    # Load a CSV file, source/destination/weight are the columns to
+    # read, given either as an index or as a name of the header line.
+    # The graph is unweighted when no weight column is given
+    names = []
+    if header:
+        with open(path) as f:
+            names = [name.strip() for name in f.readline().split(delimiter)]
+
+    def column_index(column):
+        if isinstance(column, int):
+            return column
+        if column not in names:
+            raise ValueError("There is no column %s in %s" % (column, path))
+        return names.index(column)
+
+    weighted = weight is not None
+    columns = [column_index(source), column_index(destination)]
+    if weighted:
+        columns.append(column_index(weight))
+
+    labels = LabelIndex()
+    graph = _build_graph(path, graph_class, directed, labels,
+                         delimiter=delimiter, weighted=weighted,
+                         chunk_size=chunk_size, comments="#",
+                         skip_header=header, columns=columns)
+    return graph, labels
+
+
+def load_matrix_market(path, graph_class=AdjacencyMatrixGraph,
+                       chunk_size=DEFAULT_CHUNK_SIZE):
+    # Load a Matrix Market coordinate file. The vertices are already
+    # numbered from 1 to n in this format so no LabelIndex is needed,
+    # they are only shifted to start at 0. A "symmetric" matrix is
+    # loaded as an undirected graph and a "pattern" one as unweighted
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be >= 1")
+
+    with open(path) as f:
+        banner = f.readline().lower().split()
+        if len(banner) < 5 or banner[0] != "%%matrixmarket":
+            raise ValueError("%s is not a Matrix Market file" % path)
+
+        _, obj, layout, field, symmetry = banner[:5]
+        if obj != "matrix" or layout != "coordinate":
+            raise ValueError(
+                "Only the Matrix Market coordinate format can be loaded")
+        if field == "complex":
+            raise ValueError("A graph cannot have complex edge weights")
+        if symmetry not in ("general", "symmetric"):
+            raise ValueError(
+                "Matrix Market symmetry %s is not supported" % symmetry)
+
+        # The size line is the first line after the comments
+        line = f.readline()
+        while line.startswith("%") or not line.strip():
+            line = f.readline()
+            if not line:
+                raise ValueError("%s has no size line" % path)
+
+        rows, cols, _ = (int(value) for value in line.split())
+        if rows != cols:
+            raise ValueError("The adjacency matrix of a graph must be square")
+
+        weighted = field != "pattern"
+        columns = (0, 1, 2) if weighted else (0, 1)
+        graph = graph_class(rows, directed=(symmetry == "general"))
+
+        for chunk in _read_chunks(f, chunk_size, "%"):
+            table = np.loadtxt(chunk, usecols=columns, ndmin=2, comments=None)
+
+            sources = table[:, 0].astype(np.int32) - 1
+            destinations = table[:, 1].astype(np.int32) - 1
+            weights = table[:, 2] if weighted else None
+
+            graph.add_edges(sources, destinations, weights)
+
+    return graph
@@ -5,12 +5,21 @@
 # Note : ONLY for connected graph (=no disjoint)
 #
 ##############################################################
+import instrumentation
+import kernels
 import priority_dict
 
 from graph import *
 
 
-def spanning_tree(graph, source):
+def spanning_tree(graph, source, backend="python"):
+    # stats is None unless an instrumentation profile is active
+    graph, stats = instrumentation.start("prim", graph)
+
+    # backend="jit" runs the compiled kernel on the CSR arrays
+    if kernels.use_jit(backend):
+        return _spanning_tree_jit(graph, source, stats)
+
     # A distance mapping from the vertex number to a tuple of
     # (distance from source, last vertex on path from source)
     distance_table = {}
@@ -25,6 +34,7 @@ def spanning_tree(graph, source):
     # Hold mapping of the vertex id to distance from source
     # Access the highest priority (lowest distance) item first
     priority_queue = priority_dict.priority_dict()
+    priority_queue.stats = stats
     priority_queue[source] = 0
 
     # We maintain a set of visited_vertices to not visite
@@ -36,6 +46,9 @@ def spanning_tree(graph, source):
     # '1->2': is an edge between 1 and 2
     spanning_tree = set()
 
+    if stats is not None:
+        stats.mark("initialize")
+
     while len(priority_queue.keys()) > 0:
 
         # Get the source or the lower priority vortex
@@ -48,6 +61,9 @@ def spanning_tree(graph, source):
 
         visited_vertices.add(current_vertex)
 
+        if stats is not None:
+            stats.visited_vertices += 1
+
         # If the current vertex is the source, we haven't traversed an
         # edge yet, no edge to add our spanning tree
         if current_vertex != source:
@@ -60,6 +76,9 @@ def spanning_tree(graph, source):
                 spanning_tree.add(edge)
 
         for neighbor in graph.get_adjacent_vertices(current_vertex):
+            if stats is not None:
+                stats.edge_relaxations += 1
+
             # The distance to the edge is only the weight of the edge
             # connected the neighbor
             distance = graph.get_edge_weight(current_vertex, neighbor)
@@ -76,21 +95,51 @@ def spanning_tree(graph, source):
 
                 priority_queue[neighbor] = distance
 
+    if stats is not None:
+        stats.mark("search")
+
+    for edge in spanning_tree:
+        print(edge)
+
+    return spanning_tree
+
+
+def _spanning_tree_jit(graph, source, stats):
+    indptr, indices, weights = graph.to_csr()
+
+    if stats is not None:
+        stats.mark("to_csr")
+
+    parent, order = kernels.prim_kernel(indptr, indices, weights, source)
+
+    if stats is not None:
+        stats.visited_vertices = len(order)
+        stats.mark("search")
+
+    # Same set of edges than the python version, the source is the
+    # first vertex of order and has no parent
+    spanning_tree = set()
+    for vertex in order[1:].tolist():
+        spanning_tree.add(str(parent[vertex]) + "-->" + str(vertex))
+
     for edge in spanning_tree:
         print(edge)
 
+    return spanning_tree
+
 
 # Test the implementation
-g = AdjacencyMatrixGraph(8, directed=False)
-g.add_edge(0, 1, 1)
-g.add_edge(1, 2, 2)
-g.add_edge(1, 3, 2)
-g.add_edge(2, 3, 2)
-g.add_edge(1, 4, 3)
-g.add_edge(3, 5, 1)
-g.add_edge(5, 4, 3)
-g.add_edge(3, 6, 1)
-g.add_edge(6, 7, 1)
-g.add_edge(7, 0, 1)
-
-spanning_tree(g, 3)
+if __name__ == "__main__":
+    g = AdjacencyMatrixGraph(8, directed=False)
+    g.add_edge(0, 1, 1)
+    g.add_edge(1, 2, 2)
+    g.add_edge(1, 3, 2)
+    g.add_edge(2, 3, 2)
+    g.add_edge(1, 4, 3)
+    g.add_edge(3, 5, 1)
+    g.add_edge(5, 4, 3)
+    g.add_edge(3, 6, 1)
+    g.add_edge(6, 7, 1)
+    g.add_edge(7, 0, 1)
+
+    spanning_tree(g, 3)
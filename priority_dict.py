@@ -1,4 +1,5 @@
 from heapq import heapify, heappush, heappop
+from time import perf_counter
 
 
 class priority_dict(dict):
@@ -14,8 +15,14 @@ class priority_dict(dict):
     priority, and 'pop_smallest' also removes it.
 
     The 'sorted_iter' method provides a destructive sorted iterator.
+
+    When 'stats' is set to an instrumentation.Stats, the heap pushes,
+    pops, stale pops and rebuilds are counted, and the time spent in
+    the queue is recorded under "priority_queue".
     """
 
+    stats = None
+
     def __init__(self, *args, **kwargs):
         super(priority_dict, self).__init__(*args, **kwargs)
         self._rebuild_heap()
@@ -24,6 +31,9 @@ class priority_dict(dict):
         self._heap = [(v, k) for k, v in self.items()]
         heapify(self._heap)
 
+        if self.stats is not None:
+            self.stats.heap_rebuilds += 1
+
     def smallest(self):
         """Return the item with the lowest priority.
 
@@ -34,6 +44,9 @@ class priority_dict(dict):
         v, k = heap[0]
         while k not in self or self[k] != v:
             heappop(heap)
+            if self.stats is not None:
+                self.stats.heap_pops += 1
+                self.stats.stale_pops += 1
             v, k = heap[0]
         return k
 
@@ -43,26 +56,46 @@ class priority_dict(dict):
         Raises IndexError if the object is empty.
         """
 
+        stats = self.stats
+        if stats is not None:
+            start = perf_counter()
+            stats.heap_pops += 1
+
         heap = self._heap
         v, k = heappop(heap)
         while k not in self or self[k] != v:
             v, k = heappop(heap)
+            if stats is not None:
+                stats.heap_pops += 1
+                stats.stale_pops += 1
         del self[k]
+
+        if stats is not None:
+            stats.add_time("priority_queue", perf_counter() - start)
         return k
 
     def __setitem__(self, key, val):
         # We are not going to remove the previous value from the heap,
         # since this would have a cost O(n).
 
+        stats = self.stats
+        if stats is not None:
+            start = perf_counter()
+
         super(priority_dict, self).__setitem__(key, val)
 
         if len(self._heap) < 2 * len(self):
             heappush(self._heap, (val, key))
+            if stats is not None:
+                stats.heap_pushes += 1
         else:
             # When the heap grows larger than 2 * len(self), we rebuild it
             # from scratch to avoid wasting too much memory.
             self._rebuild_heap()
 
+        if stats is not None:
+            stats.add_time("priority_queue", perf_counter() - start)
+
     def setdefault(self, key, val):
         if key not in self:
             self[key] = val
@@ -0,0 +1,322 @@
+##############################################################
+#
+# Asyncio front-end to answer shortest path queries without
+# blocking the event loop:
+#
+#   async with QueryService(graph) as service:
+#       path = await service.shortest_path(0, 6)
+#
+# - the searches (djikstra or BFS distance tables) run in a thread
+#   or process pool, never in the event loop
+# - concurrent requests sharing a source (and a kind of search) are
+#   coalesced: only one search runs and they all get its result
+# - the searches wait in a bounded queue, when it's full the callers
+#   wait too (backpressure) instead of piling up work
+# - the latency of every request served is recorded, latency_percentiles()
+#   gives the p50/p99
+#
+# Running this module starts a synthetic load on an in-process
+# service and prints the latencies:
+#   python query_service.py --requests 2000 --concurrency 200
+#
+##############################################################
+import argparse
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import djikstra
+import kernels
+import shortest_path
+from graph import *
+
+# kind of search -> function(graph, source, backend) returning the
+# distance table
+SEARCHES = {
+    "djikstra": djikstra.build_distance_table,
+    "bfs": shortest_path.build_distance_table,
+}
+
+
+def _search(graph, kind, source, backend):
+    return SEARCHES[kind](graph, source, backend)
+
+
+# With a process pool the graph is sent once to every worker process
+# when it starts, instead of being pickled with every search
+_process_graph = None
+
+
+def _init_process(graph):
+    global _process_graph
+    _process_graph = graph
+
+
+def _search_in_process(kind, source, backend):
+    return _search(_process_graph, kind, source, backend)
+
+
+def path_from_table(distance_table, source, destination):
+    # Backtrack the distance table from the destination, returns the
+    # list of vertices of the path or None if there is no path
+    if distance_table[destination][1] is None:
+        return None
+
+    path = [destination]
+    vertex = destination
+    while vertex != source:
+        vertex = distance_table[vertex][1]
+        path.append(vertex)
+
+    path.reverse()
+    return path
+
+
+class QueryService:
+
+    def __init__(self, graph, workers=4, max_pending=1024, use_processes=False,
+                 backend="python"):
+        kernels.use_jit(backend)
+
+        self.graph = graph
+        self.workers = workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self.backend = backend
+
+        # number of searches run and of requests which got the result
+        # of a search already queued or running
+        self.searches = 0
+        self.coalesced = 0
+        self.latencies = deque(maxlen=100000)
+
+        self._queue = None
+        self._executor = None
+        self._tasks = []
+        # (kind, source) -> future of the search queued or running, and
+        # the number of requests waiting for it
+        self._inflight = {}
+        self._waiting = {}
+        # puts to the queue carried on for requests coalesced on a
+        # search whose first caller gave up while the queue was full
+        self._puts = set()
+
+    async def start(self):
+        # the searches read the graph from several threads, so the
+        # edges a CSRGraph still buffers are merged (and its tombstones
+        # dropped) once now instead of by the first searches
+        if isinstance(self.graph, CSRGraph):
+            self.graph.to_csr()
+
+        if self.use_processes:
+            self._executor = ProcessPoolExecutor(self.workers, initializer=_init_process,
+                                                 initargs=(self.graph,))
+        else:
+            self._executor = ThreadPoolExecutor(self.workers)
+
+        self._queue = asyncio.Queue(self.max_pending)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        for task in self._tasks + list(self._puts):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._puts, return_exceptions=True)
+        self._tasks = []
+        self._puts = set()
+
+        # the searches still queued will never run
+        for future in self._inflight.values():
+            if not future.done():
+                future.set_exception(RuntimeError("The query service is closed"))
+        self._inflight = {}
+        self._waiting = {}
+
+        # a search already running in the pool is not stopped by the
+        # cancellation of its worker, the pool is waited for outside of
+        # the event loop
+        executor, self._executor = self._executor, None
+        await asyncio.get_running_loop().run_in_executor(
+            None, partial(executor.shutdown, wait=True))
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _worker(self):
+        # Takes the searches from the queue one by one and runs them
+        # in the pool, so at most `workers` searches run at once
+        loop = asyncio.get_running_loop()
+        while True:
+            key, future = await self._queue.get()
+            kind, source = key
+            try:
+                if self.use_processes:
+                    result = await loop.run_in_executor(
+                        self._executor, _search_in_process, kind, source, self.backend)
+                else:
+                    result = await loop.run_in_executor(
+                        self._executor, _search, self.graph, kind, source, self.backend)
+            except asyncio.CancelledError:
+                # the service is closed while the search runs, its
+                # requests would otherwise wait forever
+                if not future.done():
+                    future.set_exception(RuntimeError("The query service is closed"))
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._inflight.pop(key, None)
+                self._waiting.pop(key, None)
+                self._queue.task_done()
+
+    async def _distance_table(self, kind, source):
+        if self._queue is None:
+            raise RuntimeError("The query service is not started")
+
+        if source < 0 or source >= self.graph.numVertices:
+            raise ValueError("Cannot access vertex %d" % source)
+
+        key = (kind, source)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            self._waiting[key] = 1
+            self.searches = self.searches + 1
+            try:
+                # waits while the queue is full
+                await self._queue.put((key, future))
+            except asyncio.CancelledError:
+                if self._inflight.get(key) is future:
+                    self._waiting[key] = self._waiting[key] - 1
+                    if self._waiting[key] == 0:
+                        # no other request waits for the search, drop it
+                        del self._inflight[key]
+                        del self._waiting[key]
+                        future.cancel()
+                    else:
+                        # requests were coalesced on the search in the
+                        # meantime, it's queued for them by a task this
+                        # caller doesn't own
+                        put = asyncio.create_task(self._queue.put((key, future)))
+                        self._puts.add(put)
+                        put.add_done_callback(self._puts.discard)
+                raise
+        else:
+            self._waiting[key] = self._waiting[key] + 1
+            self.coalesced = self.coalesced + 1
+
+        # the future is shared, a caller which gives up must not
+        # cancel it for the others
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self._inflight.get(key) is future:
+                self._waiting[key] = self._waiting[key] - 1
+            raise
+
+    async def distance_table(self, source, weighted=True):
+        # Same table than djikstra.build_distance_table (weighted) or
+        # shortest_path.build_distance_table (number of hops)
+        # only the requests served are timed, not the rejected ones
+        start = time.perf_counter()
+        distance_table = await self._distance_table("djikstra" if weighted else "bfs", source)
+        self.latencies.append(time.perf_counter() - start)
+        return distance_table
+
+    async def shortest_path(self, source, destination, weighted=True):
+        # Returns the list of vertices from source to destination, or
+        # None if there is no path
+        if destination < 0 or destination >= self.graph.numVertices:
+            raise ValueError("Cannot access vertex %d" % destination)
+
+        start = time.perf_counter()
+        distance_table = await self._distance_table("djikstra" if weighted else "bfs", source)
+        path = path_from_table(distance_table, source, destination)
+        self.latencies.append(time.perf_counter() - start)
+        return path
+
+    def latency_percentiles(self, percentiles=(50, 99)):
+        # in seconds, over the last requests served
+        if not self.latencies:
+            return {}
+        values = np.percentile(np.array(self.latencies), percentiles)
+        return {"p%g" % p: float(value) for p, value in zip(percentiles, values)}
+
+
+async def load_test(service, num_requests=1000, concurrency=100, num_sources=20,
+                    weighted=True, seed=0):
+    # Synthetic load: num_requests shortest path queries, at most
+    # `concurrency` at once, with the sources picked among
+    # num_sources vertices so that some requests can be coalesced
+    rng = np.random.default_rng(seed)
+    num_vertices = service.graph.numVertices
+    sources = rng.choice(num_vertices, min(num_sources, num_vertices), replace=False)
+    queries = zip(rng.choice(sources, num_requests).tolist(),
+                  rng.integers(0, num_vertices, num_requests).tolist())
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def query(source, destination):
+        async with semaphore:
+            await service.shortest_path(source, destination, weighted)
+
+    service.latencies.clear()
+    searches, coalesced = service.searches, service.coalesced
+
+    start = time.perf_counter()
+    await asyncio.gather(*(query(source, destination) for source, destination in queries))
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "requests": num_requests,
+        "seconds": elapsed,
+        "requests_per_second": num_requests / elapsed,
+        "searches": service.searches - searches,
+        "coalesced": service.coalesced - coalesced,
+    }
+    report.update(service.latency_percentiles())
+    return report
+
+
+async def _main(args):
+    import benchmark
+
+    graph, _ = benchmark.build_graph("csr", args.generator, args.vertices, True, args.seed)
+    service = QueryService(graph, workers=args.workers, max_pending=args.max_pending,
+                           use_processes=args.processes, backend=args.backend)
+
+    async with service:
+        report = await load_test(service, args.requests, args.concurrency, args.sources,
+                                 not args.unweighted, args.seed)
+
+    print("%(requests)d requests in %(seconds).3f s (%(requests_per_second).0f requests/s)"
+          % report)
+    print("%(searches)d searches, %(coalesced)d requests coalesced" % report)
+    print("p50 %.2f ms, p99 %.2f ms" % (report["p50"] * 1000, report["p99"] * 1000))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the query service")
+    parser.add_argument("--vertices", type=int, default=2000)
+    parser.add_argument("--generator", default="erdos_renyi")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--sources", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=1024)
+    parser.add_argument("--processes", action="store_true", help="use a process pool")
+    parser.add_argument("--backend", choices=kernels.BACKENDS, default="python")
+    parser.add_argument("--unweighted", action="store_true", help="BFS instead of djikstra")
+    parser.add_argument("--seed", type=int, default=0)
+
+    asyncio.run(_main(parser.parse_args()))
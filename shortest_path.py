@@ -8,10 +8,20 @@
 #
 ##############################################################
 from queue import Queue
+
+import instrumentation
+import kernels
 from graph import *
 
 
-def build_distance_table(graph, source):
+def build_distance_table(graph, source, backend="python"):
+    # stats is None unless an instrumentation profile is active
+    graph, stats = instrumentation.start("shortest_path", graph)
+
+    # backend="jit" runs the compiled kernel on the CSR arrays
+    if kernels.use_jit(backend):
+        return _build_distance_table_jit(graph, source, stats)
+
     # A dictionnary mapping from the vertex number to a tuple of
     # (distance_from_source, last vertex seen on path from source)
     distance_table = {}
@@ -27,14 +37,23 @@ def build_distance_table(graph, source):
     # Initialy, the only distance we know it's the source node from itself =0
     queue.put(source)
 
+    if stats is not None:
+        stats.mark("initialize")
+
     while not queue.empty():
         current_vertex = queue.get()
 
+        if stats is not None:
+            stats.visited_vertices += 1
+
         # The distance of the current_vertex from the source
         current_distance = distance_table[current_vertex][0]
 
         # check if current_vertex neighbors have been visited
         for neighbor in graph.get_adjacent_vertices(current_vertex):
+            if stats is not None:
+                stats.edge_relaxations += 1
+
             # Only update the distance table if no current distant from
             # the source is set
             if distance_table[neighbor][0] is None:
@@ -46,12 +65,35 @@ def build_distance_table(graph, source):
                 if(len(graph.get_adjacent_vertices(neighbor)) > 0):
                     queue.put(neighbor)
 
+    if stats is not None:
+        stats.mark("search")
+
+    return distance_table
+
+
+def _build_distance_table_jit(graph, source, stats):
+    indptr, indices, _ = graph.to_csr()
+
+    if stats is not None:
+        stats.mark("to_csr")
+
+    distance, previous = kernels.bfs_kernel(indptr, indices, source)
+
+    if stats is not None:
+        stats.visited_vertices = int(np.count_nonzero(previous >= 0))
+        stats.mark("search")
+
+    # Same distance table than the python version
+    distance_table = {}
+    for i, (d, p) in enumerate(zip(distance.tolist(), previous.tolist())):
+        distance_table[i] = (None, None) if p < 0 else (d, p)
+
     return distance_table
 
 
-def shortest_path(graph, source, destination):
+def shortest_path(graph, source, destination, backend="python"):
     # Build the table_distance
-    distance_table = build_distance_table(graph, source)
+    distance_table = build_distance_table(graph, source, backend)
 
     # Initialy, in the short path there is only the destination
     # at the end we will backtrack the list to get the shortest_path
@@ -60,7 +102,7 @@ def shortest_path(graph, source, destination):
     # Find the last preceeding node in order to get our distance from the source
     previous_vertex = distance_table[destination][1]
 
-    while previous_vertex is not None and previous_vertex is not source:
+    while previous_vertex is not None and previous_vertex != source:
         path = [previous_vertex] + path
         previous_vertex = distance_table[previous_vertex][1]
 
@@ -69,22 +111,23 @@ def shortest_path(graph, source, destination):
     else:
         path = [source] + path
         print("Shortest path is ", path)
+        return path
 
 
 # Test implementation
-g = AdjacencySetGraph(8, directed=True)
-g.add_edge(0, 1)
-g.add_edge(1, 2)
-g.add_edge(1, 3)
-g.add_edge(2, 3)
-g.add_edge(1, 4)
-g.add_edge(3, 5)
-g.add_edge(5, 4)
-g.add_edge(3, 6)
-g.add_edge(6, 7)
-g.add_edge(0, 7)
-
-
-shortest_path(g, 0, 5)
-shortest_path(g, 0, 6)
-shortest_path(g, 7, 4)
+if __name__ == "__main__":
+    g = AdjacencySetGraph(8, directed=True)
+    g.add_edge(0, 1)
+    g.add_edge(1, 2)
+    g.add_edge(1, 3)
+    g.add_edge(2, 3)
+    g.add_edge(1, 4)
+    g.add_edge(3, 5)
+    g.add_edge(5, 4)
+    g.add_edge(3, 6)
+    g.add_edge(6, 7)
+    g.add_edge(0, 7)
+
+    shortest_path(g, 0, 5)
+    shortest_path(g, 0, 6)
+    shortest_path(g, 7, 4)
@@ -8,10 +8,19 @@
 
 from queue import Queue
 
+import instrumentation
+import kernels
 from graph import *
 
 
-def topological_sort(graph):
+def topological_sort(graph, backend="python"):
+    # stats is None unless an instrumentation profile is active
+    graph, stats = instrumentation.start("topological_sort", graph)
+
+    # backend="jit" runs the compiled kernel on the CSR arrays
+    if kernels.use_jit(backend):
+        return _topological_sort_jit(graph, stats)
+
     queue = Queue()
     indegreeMap = {}
 
@@ -25,35 +34,69 @@ def topological_sort(graph):
 
     sortedList = []
 
+    if stats is not None:
+        stats.mark("indegrees")
+
     while not queue.empty():
         vertex = queue.get()
         sortedList.append(vertex)
 
+        if stats is not None:
+            stats.visited_vertices += 1
+
         for v in graph.get_adjacent_vertices(vertex):
+            if stats is not None:
+                stats.edge_relaxations += 1
+
             indegreeMap[v] = indegreeMap[v] - 1
 
             if indegreeMap[v] == 0:
                 queue.put(v)
 
+    if stats is not None:
+        stats.mark("sort")
+
+    if len(sortedList) != graph.numVertices:
+        raise ValueError(
+            "This graph has a cycle !!! \n => topological sort is IMPOSSIBLE")
+
+    print(sortedList)
+    return sortedList
+
+
+def _topological_sort_jit(graph, stats):
+    indptr, indices, _ = graph.to_csr()
+
+    if stats is not None:
+        stats.mark("to_csr")
+
+    sortedList = kernels.topological_sort_kernel(indptr, indices).tolist()
+
+    if stats is not None:
+        stats.visited_vertices = len(sortedList)
+        stats.mark("sort")
+
     if len(sortedList) != graph.numVertices:
         raise ValueError(
             "This graph has a cycle !!! \n => topological sort is IMPOSSIBLE")
 
     print(sortedList)
+    return sortedList
 
 
 # test implementation
-g = AdjacencyMatrixGraph(9, directed=True)
-g.add_edge(0, 1)
-g.add_edge(1, 2)
-# g.add_edge(2, 0) # with this edge the graph is a directed CYCLIC graph, so topological_sort is impossible
-g.add_edge(2, 7)
-g.add_edge(2, 4)
-g.add_edge(2, 3)
-g.add_edge(1, 5)
-g.add_edge(5, 6)
-g.add_edge(3, 6)
-g.add_edge(3, 4)
-g.add_edge(6, 8)
-
-topological_sort(g)
+if __name__ == "__main__":
+    g = AdjacencyMatrixGraph(9, directed=True)
+    g.add_edge(0, 1)
+    g.add_edge(1, 2)
+    # g.add_edge(2, 0) # with this edge the graph is a directed CYCLIC graph, so topological_sort is impossible
+    g.add_edge(2, 7)
+    g.add_edge(2, 4)
+    g.add_edge(2, 3)
+    g.add_edge(1, 5)
+    g.add_edge(5, 6)
+    g.add_edge(3, 6)
+    g.add_edge(3, 4)
+    g.add_edge(6, 8)
+
+    topological_sort(g)
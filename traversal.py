@@ -4,10 +4,15 @@
 #
 ######################################################
 from queue import Queue
+
+import instrumentation
 from graph import *
 
 
 def breadth_first(graph, start=0):
+    # stats is None unless an instrumentation profile is active
+    graph, stats = instrumentation.start("breadth_first", graph)
+
     queue = Queue()
     queue.put(start)
     # note : we use queue because it's a FIFO (First In First Out)
@@ -31,6 +36,9 @@ def breadth_first(graph, start=0):
         # so the vertex is marked as 'visited'
         visited[vertex] = 1
 
+        if stats is not None:
+            stats.visited_vertices += 1
+
         # wre need to access all the neighboors of this vertex
         for v in graph.get_adjacent_vertices(vertex):
             # If these neighboors vertices haven't been  visited yet
@@ -38,8 +46,24 @@ def breadth_first(graph, start=0):
             if visited[v] != -1:
                 queue.put(v)
 
+    if stats is not None:
+        stats.mark("search")
+
+    return visited
+
 
 def depth_first(graph, visited, current=0):
+    # stats is None unless an instrumentation profile is active,
+    # the recursion itself is done by _depth_first
+    graph, stats = instrumentation.start("depth_first", graph)
+
+    _depth_first(graph, visited, current, stats)
+
+    if stats is not None:
+        stats.mark("search")
+
+
+def _depth_first(graph, visited, current, stats):
     # if current node have already been visited we end the recursion
     if visited[current] == 1:
         return
@@ -47,29 +71,33 @@ def depth_first(graph, visited, current=0):
     # we mark the current node as visited
     visited[current] = 1
 
+    if stats is not None:
+        stats.visited_vertices += 1
+
     print('Visit: ', current)
 
     # Iterates over all neighboors of current vertex
     for vertex in graph.get_adjacent_vertices(current):
-        depth_first(graph, visited, vertex)
+        _depth_first(graph, visited, vertex, stats)
 
 
 # testing implementations
-g = AdjacencyMatrixGraph(9, directed=False)
-g.add_edge(0, 1)
-g.add_edge(1, 2)
-g.add_edge(2, 7)
-g.add_edge(2, 4)
-g.add_edge(2, 3)
-g.add_edge(1, 5)
-g.add_edge(5, 6)
-g.add_edge(6, 3)
-g.add_edge(3, 4)
-g.add_edge(6, 8)
-
-# breadth_first algorithm
-# breadth_first(g, 0)
-
-# depth_first algorithm
-visited = np.zeros(g.numVertices)
-depth_first(g, visited)
+if __name__ == "__main__":
+    g = AdjacencyMatrixGraph(9, directed=False)
+    g.add_edge(0, 1)
+    g.add_edge(1, 2)
+    g.add_edge(2, 7)
+    g.add_edge(2, 4)
+    g.add_edge(2, 3)
+    g.add_edge(1, 5)
+    g.add_edge(5, 6)
+    g.add_edge(6, 3)
+    g.add_edge(3, 4)
+    g.add_edge(6, 8)
+
+    # breadth_first algorithm
+    # breadth_first(g, 0)
+
+    # depth_first algorithm
+    visited = np.zeros(g.numVertices)
+    depth_first(g, visited)